@@ -8,6 +8,7 @@ def setup(iplot=False,htmlplot=True,outdir='./_output'):
     from clawpack import pyclaw
     from clawpack import riemann
     import numpy as np
+    from chpde import frames
 
     solver = pyclaw.ClawSolver1D(riemann.acoustics_1D)
 
@@ -40,7 +41,7 @@ def setup(iplot=False,htmlplot=True,outdir='./_output'):
     claw.htmlplot = htmlplot
     claw.outdir = outdir
     claw.tfinal = 3.0
-    claw.output_format = 'ascii'
+    frames.binary_output(claw)
     claw.num_output_times   = 30
     claw.setplot = setplot
 
@@ -21,19 +21,12 @@ crossed the domain exactly once.
 from __future__ import absolute_import
 from numpy import pi, sin, sqrt
 from clawpack import riemann
+from chpde import bc
 
-def moving_wall(state,dim,t,qbc,auxbc,num_ghost):
-    eps, omega = 0.1, 2.0 * pi
-    U = lambda t : (t < 3.0) * eps * sin(omega * t) + 0.0
-    vwall = U(t)
-    if dim.on_lower_boundary:
-        for ibc in range(num_ghost):
-            # Pressure
-            qbc[0,num_ghost-1-ibc] = qbc[0,num_ghost+ibc]
-            # Velocity
-            qbc[1,num_ghost-1-ibc] = 2*vwall - qbc[1,num_ghost+ibc]
-    else:
-        print("Error in using moving wall bc")
+def wall_velocity(t, eps=0.1, omega=2.0*pi):
+    return (t < 3.0) * eps * sin(omega * t) + 0.0
+
+moving_wall = bc.wall(wall_velocity, normal=1)
 
 def setup(use_petsc=False, kernel_language='Fortran', solver_type='classic',
           outdir='./_output', ptwise=False, weno_order=5,
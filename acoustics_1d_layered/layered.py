@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# encoding: utf-8
+r"""
+Acoustics in a layered medium
+=============================
+
+Solve the variable coefficient acoustics equations in a medium of layers of
+unit width, as the Fortran code in this directory but with PyClaw and with
+the medium of chpde.layered:
+
+    medium='periodic'   densities 3, 1, 3, 1, ... as in setprob.rho
+    medium='random'     densities uniform in [1, 2)
+    medium='markov'     densities 1 and 3 in runs of random lengths
+
+A pulse is sent in by the oscillating wall at the left.  At t = 50 the
+boundary conditions become periodic, so that the pulse can be followed as
+it loops around.  The domain has one layer per unit of length, nlayers of
+them, with cells_per_layer cells in each.
+
+For an ensemble of runs in the same medium, give medium_file: the first run
+writes the medium there and the others map it into memory.  The standard
+limiters are used; the transmission-based limiter of trlimit.f is only in
+the Fortran code.
+"""
+import numpy as np
+from clawpack import riemann
+from chpde import bc, layered
+
+def g0(t):
+    return np.where(np.abs(t) < 1.0, 1.0 + np.cos(np.pi*t), 0.0)
+
+def setup(nlayers=120, cells_per_layer=4, medium='periodic', seed=None,
+          medium_file=None, t1=15.0, a1=0.2, tw1=10.0, tfinal=100.0,
+          num_output_times=100, outdir='./_output', disable_output=False):
+    from clawpack import pyclaw
+
+    solver = pyclaw.ClawSolver1D(riemann.acoustics_variable_1D)
+    solver.limiters = pyclaw.limiters.tvd.MC
+    solver.cfl_desired = 0.8
+    solver.cfl_max = 1.0
+
+    # Oscillating wall at the left, periodic after t = 50
+    solver.bc_lower[0] = pyclaw.BC.custom
+    solver.user_bc_lower = bc.wall(lambda t: a1*g0((t - t1)/tw1), normal=1)
+    solver.bc_upper[0] = pyclaw.BC.extrap
+    solver.aux_bc_lower[0] = pyclaw.BC.extrap
+    solver.aux_bc_upper[0] = pyclaw.BC.extrap
+    def switch_to_periodic(solver, state):
+        if state.t > 50.0 and solver.bc_lower[0] != pyclaw.BC.periodic:
+            solver.bc_lower[0] = solver.bc_upper[0] = pyclaw.BC.periodic
+            solver.aux_bc_lower[0] = solver.aux_bc_upper[0] = pyclaw.BC.periodic
+    solver.before_step = switch_to_periodic
+
+    x = pyclaw.Dimension(0.0,float(nlayers),nlayers*cells_per_layer,name='x')
+    domain = pyclaw.Domain(x)
+    state = pyclaw.State(domain,2,2)
+
+    kwargs = {}
+    if medium == 'periodic':
+        kwargs = {'values': (3.0, 1.0)}
+    elif medium == 'random':
+        kwargs = {'seed': seed}
+    elif medium == 'markov':
+        kwargs = {'values': (1.0, 3.0), 'transition': [[0.9, 0.1], [0.2, 0.8]],
+                  'seed': seed}
+    if medium_file is not None:
+        rho = layered.medium(medium_file, medium, nlayers, **kwargs)
+    else:
+        rho = layered.GENERATORS[medium](nlayers, **kwargs)
+    layered.set_aux(state, rho)
+
+    state.q[:,:] = 0.0
+
+    claw = pyclaw.Controller()
+    claw.solution = pyclaw.Solution(state,domain)
+    claw.solver = solver
+    claw.outdir = outdir
+    if disable_output:
+        claw.output_format = None
+    claw.tfinal = tfinal
+    claw.num_output_times = num_output_times
+    claw.setplot = setplot
+
+    return claw
+
+def setplot(plotdata):
+    """
+    Plot solution using VisClaw.
+    """
+    plotdata.clearfigures()  # clear any old figures,axes,items data
+
+    plotfigure = plotdata.new_plotfigure(name='Pressure and Velocity', figno=1)
+
+    plotaxes = plotfigure.new_plotaxes()
+    plotaxes.axescmd = 'subplot(2,1,1)'
+    plotaxes.ylimits = [-0.1,0.75]
+    plotaxes.title = 'Pressure'
+
+    plotitem = plotaxes.new_plotitem(plot_type='1d_plot')
+    plotitem.plot_var = 0
+    plotitem.plotstyle = '-'
+    plotitem.color = 'b'
+
+    plotaxes = plotfigure.new_plotaxes()
+    plotaxes.axescmd = 'subplot(2,1,2)'
+    plotaxes.ylimits = [-0.1,0.45]
+    plotaxes.title = 'Velocity'
+
+    plotitem = plotaxes.new_plotitem(plot_type='1d_plot')
+    plotitem.plot_var = 1
+    plotitem.plotstyle = '-'
+    plotitem.color = 'b'
+
+    return plotdata
+
+
+if __name__=="__main__":
+    from clawpack.pyclaw.util import run_app_from_main
+    output = run_app_from_main(setup,setplot)
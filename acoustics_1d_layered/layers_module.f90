@@ -0,0 +1,49 @@
+module layers_module
+
+    ! Densities of the layers, rho(k) for k-1 < x < k, any number of them
+
+    implicit none
+    double precision, allocatable :: rho(:)
+    integer :: nlayers = 0
+
+contains
+
+    subroutine read_layers(fname)
+
+        ! Read rho from fname.bin (raw doubles, as written by
+        ! chpde.layered.write_fortran) if it exists, or else from the text
+        ! file fname with one value per line
+
+        character(len=*), intent(in) :: fname
+        logical :: found
+        integer :: nbytes, i, ios
+        double precision :: value
+
+        inquire(file=fname//'.bin', exist=found, size=nbytes)
+        if (found) then
+            nlayers = nbytes / 8
+            allocate(rho(nlayers))
+            open(unit=8, file=fname//'.bin', status='old', &
+                 access='stream', form='unformatted')
+            read(8) rho
+            close(8)
+            return
+        endif
+
+        open(unit=8, file=fname, status='old', form='formatted')
+        nlayers = 0
+        do
+            read(8, *, iostat=ios) value
+            if (ios /= 0) exit
+            nlayers = nlayers + 1
+        end do
+        allocate(rho(nlayers))
+        rewind(8)
+        do i=1,nlayers
+            read(8, *) rho(i)
+        end do
+        close(8)
+
+    end subroutine read_layers
+
+end module layers_module
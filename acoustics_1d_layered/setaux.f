@@ -10,30 +10,33 @@
 ! 
 !     # rho value for i-1 < x < i is determined by rho(i)
 !     # input from setprob.rho in setprob.f
+!     # cells beyond the last layer take the last layer
 ! 
+      use layers_module, only: rho, nlayers
       implicit double precision (a-h,o-z)
       dimension aux(maux,1-mbc:mx+mbc)
-      common /comaux/ rho(1000)
+      logical, save :: written = .false.
   
       do i=1-mbc,mx+mbc
          xcell=xlower+(i-0.5d0)*dx
 !        # truncate to an integer to determine which layer xcell is in:
          ix=xcell+1
          if (ix.lt.1) ix=1
+         if (ix.gt.nlayers) ix=nlayers
          aux(2,i)=1.d0
          aux(1,i)=rho(ix)*aux(2,i)
 !        # uniform for comparison:
 !        aux(1,i) = aux(2,i)
       end do
   
-      open (unit=31,file='fort.aux',status='unknown',form='formatted')
-  
-      do i=1,mx
-         write (31,10) aux(1,i),aux(2,i)
-   10    format (2e16.6)
-      end do
-  
-      close (unit=31)
+!     # write aux(:,1:mx) once, as raw doubles
+      if (.not. written) then
+         open (unit=31,file='fort.aux',status='replace',
+     &         access='stream',form='unformatted')
+         write (31) aux(:,1:mx)
+         close (unit=31)
+         written = .true.
+      end if
 ! 
       return
       end
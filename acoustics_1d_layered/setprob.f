@@ -1,6 +1,6 @@
       subroutine setprob
+      use layers_module, only: read_layers
       implicit double precision (a-h,o-z)
-      common /comaux/ rho(1000)
       common /comlim/ mylim
       common /combc/ omega
       common /comwall/ pi,t1,a1,tw1,t2,a2,tw2
@@ -26,12 +26,11 @@
 !     #       save setprob.rho rho -ascii
 !     # for periodic:
 !     #       rho = mod(1:1000,2)*2 + 1;
+!     # or, for any number of layers, with chpde/layered.py, e.g.:
+!     #       layered.write_fortran(layered.random(10**6), 'setprob.rho.bin')
+!     # setprob.rho.bin is read instead of setprob.rho if it exists.
 
-      open (unit=8,file='../setprob.rho',status='old',form='formatted')
-
-      do i=1,1000
-         read (8,*) rho(i)
-      end do
+      call read_layers('../setprob.rho')
 
       return
       end
@@ -18,6 +18,7 @@ This example shows how to solve a problem with variable coefficients on a mapped
 The domain contains circular inclusions with different acoustic properties.
 """
 import numpy as np
+from chpde import bc, geometry, history
 
 # Circle radius, square radius, circle center:
 # ((r1, r2), (x0, y0))
@@ -126,30 +127,18 @@ def compute_geometry(grid):
 
     return a_x, a_y, length_ratio_left, b_x, b_y, length_ratio_bottom, area
 
-def incoming_square_wave(state,dim,t,qbc,auxbc,num_ghost):
-    """
-    Incoming square wave at left boundary.
-    """
-    if t<0.05:
-        s = 1.0
-    else:
-        s = 0.0
+def square_wave(t):
+    return 1.0 if t<0.05 else 0.0
 
-    for i in range(num_ghost):
-        reflect_ind = 2*num_ghost - i - 1
-        alpha = auxbc[0,i,:]
-        beta  = auxbc[1,i,:]
-        u_normal = alpha*qbc[1,reflect_ind,:] + beta*qbc[2,reflect_ind,:]
-        u_tangential = -beta*qbc[1,reflect_ind,:] + alpha*qbc[2,reflect_ind,:]
-        u_normal = 2.0*s - u_normal
-        qbc[0,i,:] = qbc[0,reflect_ind,:]
-        qbc[1,i,:] = alpha*u_normal - beta*u_tangential
-        qbc[2,i,:] = beta*u_normal + alpha*u_tangential
+# Incoming square wave at left boundary; aux[0:2] holds the normal to the
+# left edge of each cell
+incoming_square_wave = bc.mapped_wall(square_wave, components=(1,2),
+                                      normal_aux=(0,1))
 
 
 def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output', 
           solver_type='classic', time_integrator='SSP104', lim_type=2, 
-          num_output_times=20, disable_output=False, num_cells=200):
+          num_output_times=20, disable_output=False, num_cells=200, frame_history=False):
     from clawpack import riemann
 
     if use_petsc:
@@ -187,7 +176,9 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
     state = pyclaw.State(domain,num_eqn,num_aux)
     state.grid.mapc2p = inclusion_mapping
 
-    a_x, a_y, length_left, b_x, b_y, length_bottom, area = compute_geometry(state.grid)
+    # The metrics depend on the circles through inclusion_mapping
+    a_x, a_y, length_left, b_x, b_y, length_bottom, area = \
+        geometry.cached_metrics(compute_geometry, state.grid, key=circles)
 
     state.aux[0,:,:] = a_x
     state.aux[1,:,:] = a_y
@@ -198,19 +189,16 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
     state.aux[6,:,:] = area
     state.index_capa = 6 # aux[6,:,:] holds the capacity function
 
-    grid = state.grid
-    xp, yp = grid.p_centers
     state.aux[7,:,:] = 1.0 # Impedance
     state.aux[8,:,:] = 1.0 # Sound speed
 
     for i, circle in enumerate(circles):
-        # Set impedance and sound speed in each inclusion
+        # Set impedance and sound speed in each inclusion, weighted by the
+        # fraction of the cell inside it
         radius = circle[0][0]
-        x0, y0 = circle[1]
-        distance = np.sqrt( (xp-x0)**2 + (yp-y0)**2 )
-        in_circle = np.where(distance <= radius)
-        state.aux[7][in_circle] = impedance[i]
-        state.aux[8][in_circle] = sound_speed[i]
+        infrac = geometry.circle_fraction(state.grid, circle[1], radius)
+        state.aux[7,:,:] += infrac*(impedance[i] - state.aux[7,:,:])
+        state.aux[8,:,:] += infrac*(sound_speed[i] - state.aux[8,:,:])
 
     # Set initial condition
     state.q[0,:,:] = 0.
@@ -219,6 +207,8 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
 
     claw = pyclaw.Controller()
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
     if disable_output:
         claw.output_format = None
     claw.solution = pyclaw.Solution(state,domain)
@@ -13,16 +13,23 @@ Solve the (linear) acoustics equations:
 
 Here p is the pressure, (u,v) is the velocity, K is the bulk modulus,
 and :math:`\rho` is the density.
+
+With profiles=True only the average, min and max of q over circles around the
+origin (radial.XXXX.npz) and q along y=0 (cut.XXXX.npz) are written at each
+output time, not the full frames.
 """
 from clawpack import riemann
 import numpy as np
+from chpde import history, reduced
 
 def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output', 
               solver_type='classic', time_integrator='SSP104', ptwise=False,
-              disable_output=False):
+              disable_output=False, profiles=False, frame_history=False):
     """
     Example python script for solving the 2d acoustics equations.
     """
+    if profiles and use_petsc:
+        raise Exception('Radial profiles are not implemented with PETSc.')
     if use_petsc:
         from clawpack import petclaw as pyclaw
     else:
@@ -80,6 +87,8 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
 
     claw = pyclaw.Controller()
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
     if disable_output:
         claw.output_format = None
     claw.solution = pyclaw.Solution(state,domain)
@@ -88,6 +97,10 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
     claw.num_output_times = 10
     claw.tfinal = 0.12
     claw.setplot = setplot
+    if profiles and not disable_output:
+        reduced.reduced_output(claw, frames=False,
+                               radial=reduced.RadialAverage((0.0, 0.0), nbins=mx//2),
+                               cut=reduced.Cut(0, 0.0))
 
     return claw
 
@@ -19,10 +19,11 @@ The left and right halves of the domain consist of different materials.
 """
  
 import numpy as np
+from chpde import history
 
 def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output', 
           solver_type='classic', time_integrator='SSP104', lim_type=2, 
-          disable_output=False, num_cells=(200, 200)):
+          disable_output=False, num_cells=(200, 200), frame_history=False):
     """
     Example python script for solving the 2d acoustics equations.
     """
@@ -84,6 +85,8 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
 
     claw = pyclaw.Controller()
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
     if disable_output:
         claw.output_format = None
     claw.solution = pyclaw.Solution(state,domain)
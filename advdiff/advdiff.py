@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# encoding: utf-8
+r"""
+Advection diffusion equation
+============================
+
+Solve the advection-diffusion equation
+
+.. math::
+    q_t + u q_x = \epsilon q_{xx}
+
+with a fractional step method, as in setrun.py and src1.f but with PyClaw.
+The advection step uses the Fortran Riemann solver and the diffusion step
+is the Crank-Nicolson step of chpde.diffusion, whose factorization is only
+computed when dt changes.  The initial data is a Heaviside function and the
+boundary conditions are extrapolation.
+
+For a large grid without output:
+
+    python advdiff.py mx=1000000 disable_output=True
+"""
+import numpy as np
+from clawpack import riemann
+from chpde import diffusion
+
+def setup(mx=200, u=1.0, dcoef=0.03, outdir='./_output', disable_output=False,
+          tfinal=3.4, num_output_times=17):
+    from clawpack import pyclaw
+
+    solver = pyclaw.ClawSolver1D(riemann.advection_1D)
+    solver.bc_lower[0] = pyclaw.BC.extrap
+    solver.bc_upper[0] = pyclaw.BC.extrap
+    solver.step_source = diffusion.ImplicitDiffusion(dcoef)
+    solver.source_split = 2
+
+    x = pyclaw.Dimension(-1.0,3.0,mx,name='x')
+    domain = pyclaw.Domain(x)
+    state = pyclaw.State(domain,solver.num_eqn)
+    state.problem_data['u'] = u
+
+    # Heaviside
+    xc = state.grid.x.centers
+    state.q[0,:] = np.where(xc < 0.0, 2.0, 0.0)
+
+    claw = pyclaw.Controller()
+    claw.solution = pyclaw.Solution(state,domain)
+    claw.solver = solver
+    claw.outdir = outdir
+    if disable_output:
+        claw.output_format = None
+    claw.tfinal = tfinal
+    claw.num_output_times = num_output_times
+    claw.setplot = setplot
+
+    return claw
+
+def setplot(plotdata):
+    """
+    Plot solution using VisClaw.
+    """
+    plotdata.clearfigures()  # clear any old figures,axes,items data
+
+    plotfigure = plotdata.new_plotfigure(name='q', figno=1)
+
+    plotaxes = plotfigure.new_plotaxes()
+    plotaxes.xlimits = [-1.0, 3.0]
+    plotaxes.ylimits = [-0.5, 2.5]
+    plotaxes.title = 'q'
+
+    plotitem = plotaxes.new_plotitem(plot_type='1d_plot')
+    plotitem.plot_var = 0
+    plotitem.plotstyle = '-'
+    plotitem.color = 'b'
+
+    return plotdata
+
+
+if __name__=="__main__":
+    from clawpack.pyclaw.util import run_app_from_main
+    output = run_app_from_main(setup,setplot)
@@ -1,4 +1,3 @@
-
 c
 c
 c =========================================================
@@ -9,58 +8,74 @@ c =========================================================
 c
 c
 c     # solve the diffusion equation q_t = q_{xx} using Crank-Nicolson
-c     # The LAPACK tridiagonal solver dgtsv is used, which is in tridiag.f
+c     # for all components of q.
+c
+c     # The matrix only depends on dt, so its LU factorization is
+c     # computed when dt (or mx) changes and kept for the next calls.
+c     # With source_split = 2 this is once per time step at most, and
+c     # not at all while dt stays the same.
 c
+c     # The matrix has -dtdx2 off the diagonal, so only the diagonal
+c     # of U (stored as its inverse in rdiag) and the multipliers of L
+c     # (in elow) need to be kept.  The matrix is diagonally dominant,
+c     # so no pivoting is needed.
 c
-c     # local storage:
-      parameter (maxldb = 5000)
-      dimension b(maxldb,1), d(maxldb), dl(maxldb), du(maxldb)
+      double precision, allocatable, save :: elow(:), rdiag(:), b(:,:)
+      double precision, save :: dtsave = -1.d0
+      integer, save :: mxsave = 0, meqnsave = 0
       common /comsrc/ dcoef
 
-      if (mx .gt. maxldb) then
-          write(6,*) 'ERROR:  increase maxldb in src1.f'
-          endif
-
-      ldb = maxldb
-      nrhs = 1
-      dtdx2 = dcoef * dt / (2.d0*dx*dx) 
-c     
-c     # set coefficients in tridiagonal matrix and RHS:
-      do i=1,mx
-        dl(i) = -dtdx2
-        d(i) = 1.d0 + 2.d0*dtdx2
-        du(i) = -dtdx2
-        b(i,1) = q(1,i) + dtdx2 * (q(1,i-1) - 2.d0*q(1,i) + q(1,i+1))
-      enddo
-c
-c     # no-flux boundary conditions for diffusion step:
-c     # Adjust matrix entries to use q(1,0)=q(1,1) and q(1,mx+1)=q(1,mx)
-c     # at end of time step:
-      d(1) = d(1) - dtdx2
-      d(mx) = d(mx) - dtdx2
-      
-      
-c     # to instead set boundary values to specific values, 
-c     # comment out the above changes to d(1) and d(mx) and instead 
-c     # modify the right-hand side:
-c     q0 = 2.d0
-c     qmx1 = 0.d0
-c     b(1,1) = b(1,1) + dtdx2*q0
-c     b(mx,1) = b(mx,1) + dtdx2*qmx1
+      dtdx2 = dcoef * dt / (2.d0*dx*dx)
 
-c
-c     # solve the tridiagonal system:
-      call dgtsv(mx,nrhs,dl,d,du,b,ldb,info)
+      if (mx .ne. mxsave .or. meqn .ne. meqnsave) then
+c        # workspace for any mx
+         if (allocated(elow)) deallocate(elow, rdiag, b)
+         allocate(elow(mx), rdiag(mx), b(meqn,mx))
+         mxsave = mx
+         meqnsave = meqn
+         dtsave = -1.d0
+      endif
 
-      if (info .ne. 0) then
-         write(6,*) 'ERROR in src1 from call to dgtsv... info = ',info
-         stop
-         endif
+      if (dt .ne. dtsave) then
+c        # LU factorization of the tridiagonal matrix with
+c        # no-flux boundary conditions for diffusion step:
+c        # the matrix entries use q(1,0)=q(1,1) and q(1,mx+1)=q(1,mx)
+c        # at end of time step, so the diagonal is 1+dtdx2 at both ends
+         diag = 1.d0 + 2.d0*dtdx2 - dtdx2
+         if (mx .eq. 1) diag = 1.d0
+         rdiag(1) = 1.d0 / diag
+         elow(1) = 0.d0
+         do i=2,mx
+            diag = 1.d0 + 2.d0*dtdx2
+            if (i .eq. mx) diag = diag - dtdx2
+            elow(i) = -dtdx2 * rdiag(i-1)
+            rdiag(i) = 1.d0 / (diag + elow(i)*dtdx2)
+         enddo
+         dtsave = dt
+      endif
 
+c     # right hand side, forward substitution with L:
       do i=1,mx
-         q(1,i) = b(i,1)
+         do m=1,meqn
+            b(m,i) = q(m,i) + dtdx2 * (q(m,i-1) - 2.d0*q(m,i)
+     &                                 + q(m,i+1))
+         enddo
+      enddo
+      do i=2,mx
+         do m=1,meqn
+            b(m,i) = b(m,i) - elow(i)*b(m,i-1)
+         enddo
+      enddo
+
+c     # back substitution with U:
+      do m=1,meqn
+         q(m,mx) = b(m,mx) * rdiag(mx)
+      enddo
+      do i=mx-1,1,-1
+         do m=1,meqn
+            q(m,i) = (b(m,i) + dtdx2*q(m,i+1)) * rdiag(i)
+         enddo
       enddo
 c
       return
       end
-
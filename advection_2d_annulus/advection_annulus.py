@@ -18,6 +18,7 @@ This is the simplest example that shows how to use a mapped grid in PyClaw.
 However, it doesn't use a mapped-grid Riemann solver.
 """
 import numpy as np
+from chpde import bc, geometry, history
 
 def mapc2p_annulus(xc, yc):
     """
@@ -134,6 +135,15 @@ def edge_velocities_and_area(R_nodes,Theta_nodes,dx,dy):
     return aux
 
     
+def annulus_aux(grid):
+    """
+    Velocities and capacity for all cells of grid.
+    """
+    dx, dy = grid.delta
+    p_corners = grid.p_nodes
+    return edge_velocities_and_area(p_corners[0],p_corners[1],dx,dy)
+
+    
 def stream(Xp,Yp):
     """ 
     Calculates the stream function in physical space.
@@ -142,7 +152,7 @@ def stream(Xp,Yp):
     return np.pi*(Xp**2 + Yp**2)
 
 
-def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
+def setup(use_petsc=False,outdir='./_output',solver_type='classic', frame_history=False):
     from clawpack import riemann
 
     if use_petsc:
@@ -165,8 +175,9 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
 
     solver.aux_bc_lower[0] = pyclaw.BC.custom
     solver.aux_bc_upper[0] = pyclaw.BC.custom
-    solver.user_aux_bc_lower = ghost_velocities_lower
-    solver.user_aux_bc_upper = ghost_velocities_upper
+    # The velocity field is steady, so the ghost values are computed once
+    solver.user_aux_bc_lower = bc.SteadyAuxBC(ghost_velocities_lower,'lower')
+    solver.user_aux_bc_upper = bc.SteadyAuxBC(ghost_velocities_upper,'upper')
     solver.aux_bc_lower[1] = pyclaw.BC.periodic
     solver.aux_bc_upper[1] = pyclaw.BC.periodic
 
@@ -195,9 +206,8 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
 
     qinit(state)
 
-    dx, dy = state.grid.delta
-    p_corners = state.grid.p_nodes
-    state.aux = edge_velocities_and_area(p_corners[0],p_corners[1],dx,dy)
+    state.aux = geometry.cached_metrics(annulus_aux, state.grid,
+                        funcs=(edge_velocities_and_area,stream))
     state.index_capa = 2 # aux[2,:,:] holds the capacity function
 
     claw = pyclaw.Controller()
@@ -207,6 +217,8 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
     claw.outdir = outdir
     claw.setplot = setplot
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
 
     return claw
 
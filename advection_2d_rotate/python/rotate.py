@@ -13,8 +13,13 @@ in square domain.
 
 Here q is the density of some quantity and (u,v) is the velocity
 field.  We take a rotational velocity field: :math:`u = 2y, v = -2x`.
+
+With dcoef > 0 (classic solver) the diffusion term dcoef (q_xx + q_yy) is
+added with an implicit ADI step of chpde.diffusion; profile=True prints the
+time spent in it and in the hyperbolic step.
 """
 import numpy as np
+from chpde import diffusion, history, instrument
 
 def qinit(state):
     x, y = state.grid.p_centers
@@ -30,10 +35,15 @@ def psi(Xp,Yp):
     return Xp**2 + Yp**2
 
 
-def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
+def setup(use_petsc=False,outdir='./_output',solver_type='classic',dcoef=0.0,
+          profile=False, frame_history=False):
     from clawpack import riemann
     from clawpack.riemann.vc_advection_2D_constants import num_aux
 
+    if dcoef > 0.0 and use_petsc:
+        raise Exception('Diffusion is not implemented with PETSc.')
+    if dcoef > 0.0 and solver_type != 'classic':
+        raise Exception('Diffusion is only implemented for the classic solver.')
     if use_petsc:
         import clawpack.petclaw as pyclaw
     else:
@@ -48,6 +58,9 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
         solver.dimensional_split = False
         solver.transverse_waves = 2
         solver.order = 2
+        if dcoef > 0.0:
+            solver.step_source = diffusion.ImplicitDiffusion(dcoef)
+            solver.source_split = 2
     elif solver_type == 'sharpclaw':
         solver = pyclaw.SharpClawSolver2D(rsolver)
 
@@ -89,6 +102,10 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
     claw.outdir = outdir
     claw.setplot = setplot
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
+    if profile:
+        instrument.attach(claw)
 
     return claw
 
@@ -14,10 +14,15 @@ equation for p and q.  The Riemann solver assumes that velocities are specified
 at cell edges.
 
 This example also shows how to use your own Riemann solver.
+
+With dcoef > 0 the diffusion terms dcoef (p_xx + p_yy) and dcoef (q_xx + q_yy)
+are added to the source step with an implicit ADI step of chpde.diffusion;
+profile=True prints the time spent in the source and hyperbolic steps.
 """
 
 import numpy as np
 import os
+from chpde import diffusion, frames, instrument
 
 # Import our own Riemann solver implemented in Fortran. Compile it first if
 # necessary.
@@ -63,7 +68,7 @@ def set_velocities(solver,state):
     state.aux[:] = v_t * state.aux[:]
 
 
-def setup():
+def setup(dcoef=0.0, profile=False):
     from clawpack import pyclaw
     import advection_2d
 
@@ -94,7 +99,14 @@ def setup():
     state.aux[1,:,:] =   ( psi(Xe[1:,:-1],Ye[1:,:-1]) - psi(Xe[:-1,:-1],Ye[:-1,:-1]) ) / dx
 
     solver.before_step = set_velocities
-    solver.step_source = source_step
+    if dcoef > 0.0:
+        diffuse = diffusion.ImplicitDiffusion(dcoef)
+        def reaction_diffusion(solver,state,dt):
+            source_step(solver,state,dt)
+            diffuse(solver,state,dt)
+        solver.step_source = reaction_diffusion
+    else:
+        solver.step_source = source_step
     solver.source_split = 1
 
     state.q[0,:,:] = (Xc <= 0.5)
@@ -107,6 +119,10 @@ def setup():
     claw.num_output_times = 40
     claw.keep_copy = False
     claw.setplot = setplot
+    # Write each frame while the next one is computed
+    frames.async_output(claw)
+    if profile:
+        instrument.attach(claw)
 
     return claw
 
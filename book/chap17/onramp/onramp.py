@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# encoding: utf-8
+r"""
+Traffic flow with an on-ramp
+============================
+
+Solve the traffic flow equation with a delta function source term
+
+.. math::
+    q_t + u_{max} (q(1-q))_x = D \delta(x)
+
+as the Fortran code in this directory but with PyClaw, with the source step
+of chpde.sources.  Set D = 0.008 or 0.012 for Figure 17.6 of the book.
+More ramps, with rates given as functions of t or as tables, are added
+with ramps.add(), e.g.
+
+    claw = setup()
+    claw.solver.step_source.add(2.0, ([0.0, 10.0, 20.0], [0.0, 0.01, 0.0]))
+"""
+from clawpack import riemann
+from chpde import sources
+
+def setup(mx=500, q0=0.4, D=0.008, xramp=0.0, outdir='./_output',
+          disable_output=False):
+    from clawpack import pyclaw
+
+    solver = pyclaw.ClawSolver1D(riemann.traffic_1D)
+    solver.limiters = pyclaw.limiters.tvd.MC
+    solver.bc_lower[0] = pyclaw.BC.extrap
+    solver.bc_upper[0] = pyclaw.BC.extrap
+    ramps = sources.Sources()
+    ramps.add(xramp, D)
+    solver.step_source = ramps
+    solver.source_split = 1
+
+    x = pyclaw.Dimension(-1.0,5.0,mx,name='x')
+    domain = pyclaw.Domain(x)
+    state = pyclaw.State(domain,solver.num_eqn)
+    state.problem_data['efix'] = True
+    state.problem_data['umax'] = 1.0
+
+    state.q[0,:] = q0
+
+    claw = pyclaw.Controller()
+    claw.solution = pyclaw.Solution(state,domain)
+    claw.solver = solver
+    claw.outdir = outdir
+    if disable_output:
+        claw.output_format = None
+    claw.tfinal = 20.0
+    claw.num_output_times = 10
+    claw.setplot = setplot
+
+    return claw
+
+def setplot(plotdata):
+    """
+    Plot solution using VisClaw.
+    """
+    plotdata.clearfigures()  # clear any old figures,axes,items data
+
+    plotfigure = plotdata.new_plotfigure(name='q', figno=1)
+
+    plotaxes = plotfigure.new_plotaxes()
+    plotaxes.xlimits = [-1.0, 5.0]
+    plotaxes.ylimits = [0.0, 1.0]
+    plotaxes.title = 'Density'
+
+    plotitem = plotaxes.new_plotitem(plot_type='1d_plot')
+    plotitem.plot_var = 0
+    plotitem.plotstyle = '-'
+    plotitem.color = 'b'
+
+    return plotdata
+
+
+if __name__=="__main__":
+    from clawpack.pyclaw.util import run_app_from_main
+    output = run_app_from_main(setup,setplot)
@@ -9,13 +9,13 @@ c =========================================================
       common /comsrc/ xramp,alf
 c
 c     delta-function source term for on-ramp
+c     in the cell i with xleft .le. xramp .lt. xleft+dx,
+c     xleft = xlower + (i-1)*dx
 c
-      do i=1,mx
-	xleft = xlower + (i-1)*dx
-        if (xramp.ge.xleft .and. xramp.lt.(xleft+dx)) then
-            q(i,1) = q(i,1) + alf*dt/dx
-	    endif
-        enddo
+      i = int(floor((xramp - xlower)/dx)) + 1
+      if (i.ge.1 .and. i.le.mx) then
+          q(i,1) = q(i,1) + alf*dt/dx
+          endif
        
       return
       end
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# encoding: utf-8
+r"""
+Burgers' equation with a stiff source term
+==========================================
+
+Solve
+
+.. math::
+    u_t + (u^2/2)_x = \psi(u) = u(1-u)(u-\beta)/\tau
+
+with a fractional step method, as the Fortran code in this directory but
+with PyClaw.  The source step solves the implicit equations of all cells at
+once with chpde.stiff (method 'rk2', 'trapezoidal' or 'trbdf2', iode = 1, 2,
+3 in setprob.data).  With tau much smaller than the fixed time step the
+explicit method is unstable, and with the implicit methods the front moves
+one cell per time step, at a speed set by the grid and not by the equation.
+"""
+import numpy as np
+from clawpack import riemann
+from chpde import stiff
+
+def setup(mx=100, tau=1.0e-5, beta=0.8, method='trapezoidal', dt=0.07,
+          outdir='./_output', disable_output=False):
+    from clawpack import pyclaw
+
+    def psi(q):
+        return q*(1.0 - q)*(q - beta)/tau
+
+    def dpsi(q):
+        return (-3.0*q**2 + 2.0*(1.0 + beta)*q - beta)/tau
+
+    solver = pyclaw.ClawSolver1D(riemann.burgers_1D)
+    solver.limiters = pyclaw.limiters.tvd.minmod
+    solver.bc_lower[0] = pyclaw.BC.extrap
+    solver.bc_upper[0] = pyclaw.BC.extrap
+    solver.step_source = stiff.StiffSource(psi, dpsi, method=method)
+    solver.source_split = 1
+    # Fixed time step as in claw1ez.data
+    solver.dt_variable = False
+    solver.dt_initial = dt
+
+    x = pyclaw.Dimension(-5.0,5.0,mx,name='x')
+    domain = pyclaw.Domain(x)
+    state = pyclaw.State(domain,solver.num_eqn)
+    state.problem_data['efix'] = True
+
+    # Smoothed step of width tau
+    xi = state.grid.x.centers/tau
+    e = np.exp(np.clip(xi, -20.0, 20.0))
+    state.q[0,:] = e/(1.0 + e)
+    state.q[0,xi < -20.0] = 0.0
+    state.q[0,xi > 20.0] = 1.0
+
+    claw = pyclaw.Controller()
+    claw.solution = pyclaw.Solution(state,domain)
+    claw.solver = solver
+    claw.outdir = outdir
+    if disable_output:
+        claw.output_format = None
+    claw.tfinal = 2.87
+    claw.num_output_times = 41
+    claw.setplot = setplot
+
+    return claw
+
+def setplot(plotdata):
+    """
+    Plot solution using VisClaw.
+    """
+    plotdata.clearfigures()  # clear any old figures,axes,items data
+
+    plotfigure = plotdata.new_plotfigure(name='q', figno=1)
+
+    plotaxes = plotfigure.new_plotaxes()
+    plotaxes.xlimits = [-5.0, 5.0]
+    plotaxes.ylimits = [-0.2, 1.2]
+    plotaxes.title = 'q'
+
+    plotitem = plotaxes.new_plotitem(plot_type='1d_plot')
+    plotitem.plot_var = 0
+    plotitem.plotstyle = '-o'
+    plotitem.color = 'b'
+
+    return plotdata
+
+
+if __name__=="__main__":
+    from clawpack.pyclaw.util import run_app_from_main
+    output = run_app_from_main(setup,setplot)
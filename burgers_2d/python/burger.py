@@ -11,8 +11,9 @@ Solves Burgers equation
 """
 import numpy as np
 from clawpack import riemann
+from chpde import history
 
-def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
+def setup(use_petsc=False,outdir='./_output',solver_type='classic',frame_history=False):
 
     if use_petsc:
         import clawpack.petclaw as pyclaw
@@ -52,6 +53,8 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
     claw.solver = solver
     claw.setplot = setplot
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
 
     return claw
 
@@ -0,0 +1,7 @@
+"""
+Helpers shared by the PyClaw examples in this repository.
+
+Add the top level directory of the repository to PYTHONPATH to use them, e.g.
+
+    export PYTHONPATH=/path/to/chpde:$PYTHONPATH
+"""
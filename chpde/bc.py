@@ -0,0 +1,156 @@
+r"""
+Custom boundary conditions for PyClaw
+=====================================
+
+Each function returns a boundary condition with the signature expected by
+solver.user_bc_lower/user_bc_upper, e.g.
+
+    solver.bc_lower[0] = pyclaw.BC.custom
+    solver.user_bc_lower = bc.dirichlet([1.0, 0.0, 0.0])
+
+The ghost values are set for all ghost layers with one slice assignment, in
+whichever dimension the solver calls the function for.  Values that do not
+depend on time are prepared once when the boundary condition is created.
+
+    dirichlet     given state, constant or a function of t
+    wall          reflecting wall moving with a given normal velocity
+    mapped_wall   the same on a mapped grid, with edge normals in aux
+
+The side ('lower' or 'upper') is given when the boundary condition is
+created and must match the slot it is installed in.  A call for a patch that
+is not at that boundary (e.g. a lower boundary condition installed as
+user_bc_upper in a parallel run) raises ValueError.
+
+A custom aux boundary condition that does not depend on time can be wrapped
+with SteadyAuxBC, which calls it once and then replays the ghost values.
+"""
+import numpy as np
+
+def _normal_view(state, dim, array):
+    """
+    View of array with the direction normal to the boundary as axis 1.
+    """
+    names = [d.name for d in state.grid.dimensions]
+    return np.moveaxis(array, names.index(dim.name)+1, 1)
+
+def _ghost_cells(array, num_ghost, side):
+    if side == 'lower':
+        return array[:,:num_ghost]
+    return array[:,-num_ghost:]
+
+def _mirror_cells(array, num_ghost, side):
+    """
+    Interior cells that are the mirror images of _ghost_cells.
+    """
+    if side == 'lower':
+        return array[:,2*num_ghost-1:num_ghost-1:-1]
+    return array[:,-num_ghost-1:-2*num_ghost-1:-1]
+
+def _check_side(side):
+    if side not in ('lower', 'upper'):
+        raise ValueError("side must be 'lower' or 'upper', not %r" % side)
+
+def _check_boundary(dim, side):
+    """
+    The solver only calls user_bc_lower on patches at the lower boundary of
+    dim (and user_bc_upper at the upper one), so a patch that is not there
+    means the boundary condition was installed in the wrong slot.
+    """
+    if getattr(dim, 'on_%s_boundary' % side, None) is False:
+        raise ValueError('Boundary condition for the %s side of %s called on '
+                         'a patch that is not at that boundary' % (side, dim.name))
+
+def _value(value, t):
+    return value(t) if callable(value) else value
+
+def dirichlet(qvalue, side='lower'):
+    """
+    Set all ghost cells to the state qvalue, a sequence with one value per
+    equation, or a function of t returning one.
+    """
+    _check_side(side)
+    if not callable(qvalue):
+        qvalue = np.asarray(qvalue, dtype=float)
+
+    def bc(state, dim, t, qbc, auxbc, num_ghost):
+        _check_boundary(dim, side)
+        ghost = _ghost_cells(_normal_view(state, dim, qbc), num_ghost, side)
+        value = np.asarray(_value(qvalue, t), dtype=float)
+        ghost[...] = value.reshape((-1,) + (1,)*(ghost.ndim-1))
+    return bc
+
+def wall(velocity, normal, side='lower'):
+    """
+    Reflecting wall moving with the given normal velocity, a number or a
+    function of t.  normal is the index in q of the normal velocity (or
+    momentum); the other components are reflected unchanged.
+    """
+    _check_side(side)
+
+    def bc(state, dim, t, qbc, auxbc, num_ghost):
+        _check_boundary(dim, side)
+        q = _normal_view(state, dim, qbc)
+        ghost = _ghost_cells(q, num_ghost, side)
+        mirror = _mirror_cells(q, num_ghost, side)
+        ghost[...] = mirror
+        ghost[normal] = 2.0*_value(velocity, t) - mirror[normal]
+    return bc
+
+def mapped_wall(velocity, components, normal_aux, side='lower'):
+    """
+    Reflecting wall on a mapped grid, moving with the given normal velocity
+    (a number or a function of t).  components are the indices in q of the
+    (x,y) velocity and normal_aux the indices in aux of the (x,y) components
+    of the unit normal to the cell edges.
+    """
+    _check_side(side)
+    iu, iv = components
+    ia, ib = normal_aux
+
+    def bc(state, dim, t, qbc, auxbc, num_ghost):
+        _check_boundary(dim, side)
+        q = _normal_view(state, dim, qbc)
+        aux = _normal_view(state, dim, auxbc)
+        ghost = _ghost_cells(q, num_ghost, side)
+        mirror = _mirror_cells(q, num_ghost, side)
+        alpha = _ghost_cells(aux, num_ghost, side)[ia]
+        beta = _ghost_cells(aux, num_ghost, side)[ib]
+
+        u_normal = alpha*mirror[iu] + beta*mirror[iv]
+        u_tangential = -beta*mirror[iu] + alpha*mirror[iv]
+        u_normal = 2.0*_value(velocity, t) - u_normal
+        ghost[...] = mirror
+        ghost[iu] = alpha*u_normal - beta*u_tangential
+        ghost[iv] = beta*u_normal + alpha*u_tangential
+    return bc
+
+class SteadyAuxBC(object):
+    """
+    Wrap a custom aux boundary condition whose ghost values do not change in
+    time, e.g.
+
+        solver.user_aux_bc_lower = bc.SteadyAuxBC(ghost_aux_lower, 'lower')
+
+    The wrapped function is called the first time the boundary condition is
+    needed in each dimension; later calls copy the saved ghost values into
+    auxbc.  Call invalidate() when the aux values change (e.g. for a time
+    dependent velocity field) so that they are recomputed at the next call.
+    """
+    def __init__(self, fun, side='lower'):
+        _check_side(side)
+        self.fun = fun
+        self.side = side
+        self._ghost = {}
+
+    def invalidate(self):
+        self._ghost.clear()
+
+    def __call__(self, state, dim, t, qbc, auxbc, num_ghost):
+        _check_boundary(dim, self.side)
+        ghost = _ghost_cells(_normal_view(state, dim, auxbc), num_ghost, self.side)
+        saved = self._ghost.get(dim.name)
+        if saved is None or saved.shape != ghost.shape:
+            self.fun(state, dim, t, qbc, auxbc, num_ghost)
+            self._ghost[dim.name] = ghost.copy()
+        else:
+            ghost[...] = saved
@@ -0,0 +1,265 @@
+r"""
+Benchmark the PyClaw examples
+=============================
+
+Find the examples that define setup() returning a PyClaw Controller, run
+each of them with output disabled at a ladder of resolutions, and record
+wall time, number of time steps, cell updates per second and peak memory.
+Results are appended to a CSV or JSON history file, so that changes in
+throughput can be tracked over time.
+
+Run from the top level directory of the repository:
+
+    python -m chpde.benchmark                                  # all examples
+    python -m chpde.benchmark euler_2d/shock_bubble_interaction.py --refine 1 2 4
+    python -m chpde.benchmark kpp_2d --set solver_type=sharpclaw
+    python -m chpde.benchmark --history bench.csv --tfinal 0.1
+
+The resolution is scaled by multiplying the default value of the setup()
+arguments mx, my, nx, ncell, num_cells and N.  Examples without such an
+argument are run at their default resolution only.  Options given with
+--set are passed to setup() if it accepts them, which allows comparing e.g.
+kernel_language or solver_type.
+
+Each run is done in a separate process, so that peak memory is measured per
+run and a failing example does not stop the others.
+"""
+import argparse
+import csv
+import datetime
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+RESOLUTION_ARGS = ('mx', 'my', 'nx', 'ncell', 'num_cells', 'N')
+EXCLUDE_DIRS = ('book', 'chpde', '.git')
+NOT_DRIVERS = ('setup.py', 'setrun.py', 'setplot.py')
+
+FIELDS = ('date', 'commit', 'host', 'driver', 'refine', 'kwargs', 'num_cells',
+          'num_steps', 'setup_time', 'run_time', 'cell_updates_per_sec',
+          'peak_rss_mb', 'status')
+
+def repo_root():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def find_drivers(paths=None, root=None):
+    """
+    Return the python files under paths (files or directories, default the
+    whole repository) that define setup() and use PyClaw.
+    """
+    root = root or repo_root()
+    if not paths:
+        paths = [root]
+    drivers = []
+    for path in paths:
+        if os.path.isfile(path):
+            drivers.append(os.path.abspath(path))
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDE_DIRS
+                                 and not d.startswith(('_', '.')))
+            for name in sorted(filenames):
+                if not name.endswith('.py') or name in NOT_DRIVERS:
+                    continue
+                filename = os.path.join(dirpath, name)
+                with open(filename) as f:
+                    source = f.read()
+                if '\ndef setup(' in source and 'pyclaw' in source:
+                    drivers.append(os.path.abspath(filename))
+    return drivers
+
+def load_driver(path):
+    """
+    Import an example as a module, with its directory first on sys.path so
+    that it can import its neighbours.
+    """
+    dirname = os.path.dirname(path)
+    sys.path.insert(0, dirname)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def scaled_resolution(setup, refine):
+    """
+    setup() arguments that multiply the default resolution by refine.
+    """
+    params = inspect.signature(setup).parameters
+    kwargs = {}
+    for name in RESOLUTION_ARGS:
+        if name not in params:
+            continue
+        default = params[name].default
+        if isinstance(default, int) and not isinstance(default, bool):
+            kwargs[name] = default*refine
+        elif isinstance(default, tuple):
+            kwargs[name] = tuple(n*refine for n in default)
+    return kwargs
+
+def _peak_rss_mb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss/2.0**20 if sys.platform == 'darwin' else rss/2.0**10
+
+def run_driver(path, refine=1, kwargs=None, tfinal=None):
+    """
+    Run one example with output disabled and return a dict of measurements.
+    This is called in a separate process by benchmark().
+    """
+    import numpy as np
+
+    os.chdir(os.path.dirname(path))
+    module = load_driver(path)
+    params = inspect.signature(module.setup).parameters
+
+    setup_kwargs = scaled_resolution(module.setup, refine)
+    if refine != 1 and not setup_kwargs:
+        return {'status': 'skipped: no resolution argument'}
+    for key, value in (kwargs or {}).items():
+        if key in params:
+            setup_kwargs[key] = value
+    # Removed with whatever the run wrote there
+    with tempfile.TemporaryDirectory(prefix='bench_') as outdir:
+        if 'outdir' in params:
+            setup_kwargs['outdir'] = outdir
+        if 'disable_output' in params:
+            setup_kwargs['disable_output'] = True
+
+        t0 = time.perf_counter()
+        claw = module.setup(**setup_kwargs)
+        t1 = time.perf_counter()
+        claw.output_format = None
+        claw.keep_copy = False
+        claw.outdir = outdir
+        claw.verbosity = 0
+        if tfinal is not None:
+            claw.tfinal = tfinal
+        claw.run()
+        t2 = time.perf_counter()
+
+    setup_kwargs.pop('outdir', None)
+    num_cells = int(np.prod(claw.solution.state.grid.num_cells))
+    num_steps = claw.solver.status['numsteps']
+    return {'kwargs'              : json.dumps(setup_kwargs),
+            'num_cells'           : num_cells,
+            'num_steps'           : num_steps,
+            'setup_time'          : t1 - t0,
+            'run_time'            : t2 - t1,
+            'cell_updates_per_sec': num_cells*num_steps/(t2 - t1),
+            'peak_rss_mb'         : _peak_rss_mb(),
+            'status'              : 'ok'}
+
+def _commit(root):
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=root, stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def benchmark(drivers, refine=(1,), kwargs=None, tfinal=None, timeout=None):
+    """
+    Run each driver at each refinement factor in a subprocess and return a
+    list of result rows.
+    """
+    root = repo_root()
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    env.setdefault('MPLBACKEND', 'Agg')
+    common = {'date'  : datetime.datetime.now().isoformat(timespec='seconds'),
+              'commit': _commit(root),
+              'host'  : platform.node()}
+    rows = []
+    for path in drivers:
+        for r in refine:
+            job = json.dumps({'path': path, 'refine': r, 'kwargs': kwargs,
+                              'tfinal': tfinal})
+            row = dict(common, driver=os.path.relpath(path, root), refine=r)
+            try:
+                proc = subprocess.run([sys.executable, '-m', 'chpde.benchmark',
+                                       '--worker', job], env=env, timeout=timeout,
+                                      capture_output=True, text=True)
+                lines = proc.stdout.strip().splitlines()
+                if proc.returncode == 0 and lines:
+                    row.update(json.loads(lines[-1]))
+                else:
+                    error = proc.stderr.strip().splitlines() or ['no output']
+                    row['status'] = 'error: ' + error[-1]
+            except subprocess.TimeoutExpired:
+                row['status'] = 'timeout'
+            rows.append(row)
+            print(format_row(row))
+            sys.stdout.flush()
+    return rows
+
+def format_row(row):
+    if row.get('status') != 'ok':
+        return '%-55s x%-3d %s' % (row['driver'], row['refine'], row.get('status'))
+    return ('%-55s x%-3d %9d cells %6d steps %8.2f s %10.3e cells/s %8.1f MB'
+            % (row['driver'], row['refine'], row['num_cells'], row['num_steps'],
+               row['run_time'], row['cell_updates_per_sec'], row['peak_rss_mb']))
+
+def append_history(filename, rows):
+    """
+    Append rows to a CSV file, or to the list stored in a JSON file.
+    """
+    if filename.endswith('.json'):
+        history = []
+        if os.path.exists(filename):
+            with open(filename) as f:
+                history = json.load(f)
+        with open(filename, 'w') as f:
+            json.dump(history + rows, f, indent=1)
+    else:
+        new = not os.path.exists(filename)
+        with open(filename, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction='ignore')
+            if new:
+                writer.writeheader()
+            writer.writerows(rows)
+
+def _parse_value(value):
+    import ast
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the PyClaw examples')
+    parser.add_argument('paths', nargs='*', help='Example files or directories')
+    parser.add_argument('--refine', type=int, nargs='+', default=[1],
+                        help='Factors multiplying the default resolution')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='Argument passed to setup(), may be repeated')
+    parser.add_argument('--tfinal', type=float, help='Override the final time')
+    parser.add_argument('--timeout', type=float, help='Time limit per run (s)')
+    parser.add_argument('--history', default='benchmark_history.csv',
+                        help='CSV or JSON file the results are appended to')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        job = json.loads(args.worker)
+        # Keep stdout of the example away from the result line
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = run_driver(job['path'], job['refine'], job['kwargs'], job['tfinal'])
+        stdout.write(json.dumps(result) + '\n')
+        return
+
+    kwargs = dict(item.split('=', 1) for item in args.set)
+    kwargs = {key: _parse_value(value) for key, value in kwargs.items()}
+    rows = benchmark(find_drivers(args.paths), args.refine, kwargs,
+                     args.tfinal, args.timeout)
+    append_history(args.history, rows)
+
+if __name__ == '__main__':
+    main()
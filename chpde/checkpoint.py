@@ -0,0 +1,242 @@
+r"""
+Checkpoint and restart of PyClaw runs
+=====================================
+
+Save the state of a run at output times, so that a long run can be
+continued later:
+
+    claw = pyclaw.Controller()
+    ...
+    checkpoint.checkpoint_output(claw, every=5)
+    if restart_from is not None:
+        checkpoint.restart(claw, restart_from)
+    return claw
+
+    every       save after every every'th output frame
+    seconds     also save at the first output time after seconds of wall
+                time since the last checkpoint
+    keep        number of checkpoints kept in the directory
+    directory   where to save (default: claw.outdir)
+
+A checkpoint is outdir/checkpoint.XXXX.npz, with XXXX the frame number.
+It has q, aux, t, the output times of the run and the state of the solver
+that is carried from step to step: dt, the CFL number, the status counters
+and, for SharpClaw, the stages and previous steps of the multistep methods.
+It is written to a temporary file which is then renamed, so a run killed
+while saving leaves the previous checkpoint intact.
+
+restart(claw, restart_from) is called at the end of setup(): restart_from
+is a checkpoint file, or a directory for its latest checkpoint.  q and aux
+are taken from the checkpoint, so setup() can skip computing the initial
+data, and the state of the solver is restored at the first step, once
+claw.run has set it up.  The run continues from that frame with the same
+output times and gives the same results, to the last bit, as the run
+without restart.  Frames already in claw.frames (keep_copy) before the
+restart are not restored.  Checkpoints are not implemented with PETSc.
+"""
+import glob
+import json
+import os
+import time
+import weakref
+import numpy as np
+
+# Scalars and arrays of the solvers carried from one step to the next
+SCALARS = ('dt', 'dt_old', 'accept_step', 'lmm_cond', 'sspcoeff0')
+ARRAYS = ('dq_dt',)
+LISTS = ('prev_dq_dt_values', 'prev_dt_values', 'prev_dtFE_values')
+
+def _file(directory, frame):
+    return os.path.join(directory, 'checkpoint.%s.npz' % str(frame).zfill(4))
+
+def _number(value):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return float(value)
+
+def save(claw, frame, out_times, directory=None):
+    """
+    Write the checkpoint of claw at frame and return the file name.
+    out_times are the output times from this frame on.
+    """
+    directory = directory or claw.outdir
+    os.makedirs(directory, exist_ok=True)
+    solver = claw.solver
+    state = claw.solution.state
+    arrays = {'q': state.q, 't': claw.solution.t, 'out_times': out_times}
+    if state.aux is not None:
+        arrays['aux'] = state.aux
+    info = {'frame': frame,
+            'status': {k: _number(v) for k, v in solver.status.items()},
+            'cfl': _number(solver.cfl.get_cached_max()),
+            'scalars': {}, 'lists': {}}
+    for name in SCALARS:
+        value = getattr(solver, name, None)
+        if value is not None:
+            info['scalars'][name] = _number(value)
+    for name in ARRAYS:
+        if getattr(solver, name, None) is not None:
+            arrays[name] = getattr(solver, name)
+    for name in LISTS:
+        values = getattr(solver, name, None)
+        if values:
+            info['lists'][name] = len(values)
+            for i, value in enumerate(values):
+                arrays['%s_%d' % (name, i)] = value
+    registers = getattr(solver, '_registers', None) or []
+    info['registers'] = [_number(s.t) for s in registers]
+    for i, s in enumerate(registers):
+        arrays['register_%d' % i] = s.q
+    arrays['info'] = np.frombuffer(json.dumps(info).encode(), np.uint8)
+
+    filename = _file(directory, frame)
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+    return filename
+
+def latest(directory):
+    """
+    Latest checkpoint in directory, or None.
+    """
+    files = sorted(glob.glob(os.path.join(directory, 'checkpoint.[0-9]*.npz')))
+    return files[-1] if files else None
+
+def _check_serial(claw):
+    if type(claw.solution).__module__.startswith('clawpack.petclaw'):
+        raise ValueError('Checkpoints are not implemented with PETSc.')
+
+# Options of checkpoint_output by Controller, and the solver state read by
+# restart() by solver, restored at the first step of the run
+_outputs = weakref.WeakKeyDictionary()
+_pending = weakref.WeakKeyDictionary()
+
+def _install(claw):
+    """
+    Wrap claw.run, once, to save checkpoints and restore the solver state
+    during the run.  The original run and solver.evolve_to_time are put
+    back at the end of the run, so that the wrappers do not keep claw and
+    the solver (whose Fortran arrays are freed when it is deleted) alive in
+    a reference cycle.
+    """
+    run = claw.__dict__.get('run')
+    if getattr(run, '__name__', None) == 'run_with_checkpoints':
+        return
+
+    def run_with_checkpoints():
+        solver = claw.solver
+        options = _outputs.get(claw)
+        if options is not None:
+            if claw.output_style not in (1, 2):
+                raise ValueError('Checkpoints need output_style 1 or 2')
+            # The output times as computed by Controller.run
+            if claw.output_style == 1:
+                times = np.linspace(claw.solution.t, claw.tfinal,
+                                    claw.num_output_times+1)
+            else:
+                times = np.asarray(claw.out_times, dtype=float)
+            start = claw.solution.start_frame
+            run_info = {'frame': start, 'saved': time.time()}
+
+        wrapped = solver.__dict__.get('evolve_to_time')
+        evolve = solver.evolve_to_time
+
+        def evolve_and_save(solution, tend=None):
+            saved = _pending.pop(solver, None)
+            if saved is not None:
+                # After the Controller has set up the solver and dt
+                _restore_solver(solver, *saved)
+            status = evolve(solution, tend)
+            if options is None:
+                return status
+            every, seconds, keep, directory = options
+            run_info['frame'] += 1
+            frame = run_info['frame']
+            due = frame % every == 0
+            if seconds is not None and time.time() - run_info['saved'] >= seconds:
+                due = True
+            if due:
+                d = directory or claw.outdir
+                save(claw, frame, times[frame - start:], d)
+                run_info['saved'] = time.time()
+                old = sorted(glob.glob(os.path.join(d, 'checkpoint.[0-9]*.npz')))
+                for f in old[:-keep]:
+                    os.remove(f)
+            return status
+
+        solver.evolve_to_time = evolve_and_save
+        try:
+            return run() if run is not None else type(claw).run(claw)
+        finally:
+            if wrapped is None:
+                del solver.evolve_to_time
+            else:
+                solver.evolve_to_time = wrapped
+            if run is None:
+                claw.__dict__.pop('run', None)
+            else:
+                claw.run = run
+
+    claw.run = run_with_checkpoints
+
+def checkpoint_output(claw, every=1, seconds=None, keep=2, directory=None):
+    """
+    Make the Controller claw save a checkpoint at output times, see above.
+    """
+    _check_serial(claw)
+    _outputs[claw] = (every, seconds, keep, directory)
+    _install(claw)
+
+def _restore_solver(solver, info, arrays):
+    solver.status.update(info['status'])
+    solver.cfl.set_global_max(info['cfl'])
+    for name, value in info['scalars'].items():
+        setattr(solver, name, value)
+    for name in ARRAYS:
+        if name in arrays:
+            setattr(solver, name, arrays[name].copy('F'))
+    for name, n in info['lists'].items():
+        values = [arrays['%s_%d' % (name, i)] for i in range(n)]
+        setattr(solver, name, [float(v) if v.ndim == 0 else v.copy('F')
+                               for v in values])
+    for i, t in enumerate(info['registers']):
+        solver._registers[i].q = arrays['register_%d' % i].copy('F')
+        solver._registers[i].t = t
+
+def restart(claw, restart_from):
+    """
+    Continue the run of claw from a checkpoint file, or from the latest
+    checkpoint in a directory.
+    """
+    _check_serial(claw)
+    filename = restart_from
+    if os.path.isdir(restart_from):
+        filename = latest(restart_from)
+        if filename is None:
+            raise IOError('No checkpoint in %s' % restart_from)
+    with np.load(filename) as data:
+        arrays = {key: data[key] for key in data.files}
+    info = json.loads(arrays['info'].tobytes().decode())
+    frame = info['frame']
+
+    solution = claw.solution
+    state = solution.state
+    state.q[...] = arrays['q']
+    if 'aux' in arrays:
+        state.aux[...] = arrays['aux']
+    solution.t = float(arrays['t'])
+    solution._start_frame = frame
+
+    # The solver is set up by claw.run, which also resets dt to dt_initial,
+    # so its state is restored at the first step
+    _pending[claw.solver] = (info, arrays)
+    _install(claw)
+
+    claw.output_style = 2
+    claw.out_times = arrays['out_times']
+    return frame
@@ -0,0 +1,217 @@
+r"""
+Compressed output in tiles
+==========================
+
+Write frames of a PyClaw run with each component of q (and aux) split in
+tiles of tile**num_dim cells, each compressed separately:
+
+    from chpde import chunked
+    chunked.chunked_output(claw, dtype='float32', tile=64)
+
+A frame is a file fort.zXXXX: a header (JSON) with the grid, the time and
+the position of each compressed tile, followed by the tiles.  fort.tXXXX is
+written as for the other formats, with file_format 'chunked', so the
+frames are found by chpde.frames (FrameReader, Catalog, read_frame).
+
+    dtype        'float64' or 'float32' (rounds the values)
+    compression  'zlib', 'bz2', 'lzma' (standard library) or None
+    level        compression level
+    shuffle      group the bytes of the values by significance before
+                 compressing, which compresses floating point data better
+
+Part of one component is read by decompressing only the tiles it touches:
+
+    frame = chunked.ChunkedFrame('_output/fort.z0010')
+    rho = frame.read(0, (slice(100, 200), slice(0, 50)))
+"""
+import bz2
+import itertools
+import json
+import lzma
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b'CHPDEZ1\n'
+
+_compress = {'zlib': lambda data, level: zlib.compress(data, level),
+             'bz2' : lambda data, level: bz2.compress(data, max(level, 1)),
+             'lzma': lambda data, level: lzma.compress(data, preset=level),
+             None  : lambda data, level: data}
+_decompress = {'zlib': zlib.decompress, 'bz2': bz2.decompress,
+               'lzma': lzma.decompress, None: lambda data: data}
+
+def _tiles(num_cells, tile):
+    """
+    Slices of all the tiles, the index of the last dimension varying fastest.
+    """
+    ranges = [[slice(i, min(i+tile, n)) for i in range(0, n, tile)]
+              for n in num_cells]
+    return list(itertools.product(*ranges))
+
+def _encode(block, dtype, compression, level, shuffle):
+    data = np.asarray(block, dtype=dtype).tobytes(order='F')
+    if shuffle:
+        itemsize = np.dtype(dtype).itemsize
+        data = np.frombuffer(data, np.uint8).reshape(-1, itemsize).T.tobytes()
+    return _compress[compression](data, level)
+
+def _decode(data, shape, dtype, compression, shuffle):
+    data = _decompress[compression](data)
+    if shuffle:
+        itemsize = np.dtype(dtype).itemsize
+        data = np.frombuffer(data, np.uint8).reshape(itemsize, -1).T.tobytes()
+    return np.frombuffer(data, dtype=dtype).reshape(shape, order='F')
+
+def write_chunked(solution, frame, path='./', file_prefix='fort', write_aux=False,
+                  options={}, write_p=False):
+    """
+    Write a frame in the chunked format, with the same arguments as the
+    PyClaw writers.  options may set dtype, tile, compression, level and
+    shuffle.
+    """
+    from chpde.frames import _frame_file, write_t
+    if len(solution.states) != 1:
+        raise ValueError('Chunked output supports a single patch')
+    state = solution.states[0]
+    grid = state.grid
+    dtype = np.dtype(options.get('dtype', 'float64')).newbyteorder('<').str
+    tile = options.get('tile', 64)
+    compression = options.get('compression', 'zlib')
+    level = options.get('level', 6)
+    shuffle = options.get('shuffle', True)
+
+    arrays = {'q': state.p if write_p else state.q}
+    if write_aux and state.aux is not None:
+        arrays['aux'] = state.aux
+    tiles = _tiles(grid.num_cells, tile)
+    header = {'t'          : float(solution.t),
+              'names'      : [d.name for d in grid.dimensions],
+              'num_cells'  : [int(n) for n in grid.num_cells],
+              'lower'      : [float(x) for x in grid.lower],
+              'upper'      : [float(x) for x in grid.upper],
+              'dtype'      : dtype,
+              'tile'       : tile,
+              'compression': compression,
+              'shuffle'    : shuffle,
+              'fields'     : {}}
+    blocks = []
+    offset = 0
+    for name, array in arrays.items():
+        index = []
+        for m in range(array.shape[0]):
+            positions = []
+            for sl in tiles:
+                data = _encode(array[(m,) + sl], dtype, compression, level, shuffle)
+                blocks.append(data)
+                positions.append([offset, len(data)])
+                offset += len(data)
+            index.append(positions)
+        header['fields'][name] = index
+
+    write_t(solution, frame, path, file_prefix, 'chunked', write_p)
+    text = json.dumps(header).encode()
+    with open(_frame_file(path, file_prefix, 'z', frame), 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(text)))
+        f.write(text)
+        for data in blocks:
+            f.write(data)
+
+def chunked_output(claw, dtype='float64', tile=64, compression='zlib', level=6,
+                   shuffle=True):
+    """
+    Make the Controller claw write its frames with write_chunked().
+    """
+    from chpde.frames import _install
+    _install(claw.solution)
+    claw.output_format = 'chunked'
+    claw.output_options = {'dtype': dtype, 'tile': tile, 'compression': compression,
+                           'level': level, 'shuffle': shuffle}
+
+class ChunkedFrame(object):
+    """
+    A frame written by write_chunked().  Only the header is read when the
+    frame is opened.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('%s is not a chunked frame' % filename)
+            size, = struct.unpack('<Q', f.read(8))
+            self.header = json.loads(f.read(size).decode())
+        self.data_start = len(MAGIC) + 8 + size
+        self.t = self.header['t']
+        self.num_cells = self.header['num_cells']
+        self.tiles = _tiles(self.num_cells, self.header['tile'])
+
+    def num_components(self, field='q'):
+        return len(self.header['fields'].get(field, []))
+
+    def read(self, m=None, window=None, field='q'):
+        """
+        Values of component m of field ('q' or 'aux'), or of all components
+        if m is None, in window, a tuple of slices with one per dimension
+        (default: all cells).  Only the tiles that intersect the window are
+        read and decompressed.
+        """
+        if m is None:
+            return np.array([self.read(k, window, field)
+                             for k in range(self.num_components(field))])
+        h = self.header
+        if window is None:
+            window = (slice(None),)*len(self.num_cells)
+        bounds = [sl.indices(n) for sl, n in zip(window, self.num_cells)]
+        counts = [len(range(*b)) for b in bounds]
+        if 0 in counts:
+            return np.empty(counts, dtype=h['dtype'])
+        # Cells covered by the window, stepping is done at the end
+        lo = [min(b[0], b[1]) if b[2] > 0 else b[1] + 1 for b in bounds]
+        hi = [max(b[0], b[1]) if b[2] > 0 else b[0] + 1 for b in bounds]
+        out = np.empty([max(h_ - l, 0) for l, h_ in zip(lo, hi)], dtype=h['dtype'])
+        positions = h['fields'][field][m]
+        with open(self.filename, 'rb') as f:
+            for k, sl in enumerate(self.tiles):
+                start = [max(s.start, l) for s, l in zip(sl, lo)]
+                stop = [min(s.stop, h_) for s, h_ in zip(sl, hi)]
+                if any(a >= b for a, b in zip(start, stop)):
+                    continue
+                offset, length = positions[k]
+                f.seek(self.data_start + offset)
+                shape = [s.stop - s.start for s in sl]
+                block = _decode(f.read(length), shape, h['dtype'],
+                                h['compression'], h['shuffle'])
+                src = tuple(slice(a - s.start, b - s.start)
+                            for a, b, s in zip(start, stop, sl))
+                dst = tuple(slice(a - l, b - l) for a, b, l in zip(start, stop, lo))
+                out[dst] = block[src]
+        step = tuple(slice(None, None, b[2]) if b[2] > 0 else
+                     slice(b[0] - l, None if b[1] - l < 0 else b[1] - l, b[2])
+                     for b, l in zip(bounds, lo))
+        return out[step]
+
+def read_chunked(frame, path='_output', file_prefix='fort', read_aux=False):
+    """
+    Read a chunked frame into a new pyclaw.Solution.
+    """
+    from clawpack import pyclaw
+    from chpde.frames import _frame_file
+    f = ChunkedFrame(_frame_file(path, file_prefix, 'z', frame))
+    h = f.header
+    dimensions = [pyclaw.Dimension(lower, upper, n, name=name) for lower, upper, n, name
+                  in zip(h['lower'], h['upper'], h['num_cells'], h['names'])]
+    domain = pyclaw.Domain(dimensions)
+    faux = f
+    if read_aux and f.num_components('aux') == 0 and frame != 0:
+        # aux is written once at the start if it does not change
+        faux = ChunkedFrame(_frame_file(path, file_prefix, 'z', 0))
+    num_aux = faux.num_components('aux') if read_aux else 0
+    state = pyclaw.State(domain, f.num_components('q'), num_aux)
+    state.q[...] = f.read(field='q')
+    if num_aux > 0:
+        state.aux[...] = faux.read(field='aux')
+    state.t = f.t
+    sol = pyclaw.Solution(state, domain)
+    sol.t = f.t
+    return sol
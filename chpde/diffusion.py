@@ -0,0 +1,110 @@
+r"""
+Implicit diffusion step for PyClaw
+==================================
+
+Crank-Nicolson step for the diffusion equation q_t = dcoef (q_xx + q_yy),
+to use as the source term of a fractional step method:
+
+    solver.step_source = diffusion.ImplicitDiffusion(dcoef=0.03)
+    solver.source_split = 2
+
+In 2D and 3D the step is alternating direction implicit: a Crank-Nicolson
+step in x for all rows, then in y for all columns, etc.  With no-flux
+boundaries and a constant dcoef the 1D operators commute, so this is
+second order in time like the 1D step.  dcoef can also be given per axis.
+
+The ends have no-flux boundary conditions, q(0) = q(1) and q(mx+1) = q(mx)
+at both time levels, as in advdiff/src1.f.  All components of q (or those
+in components) are solved together, with one right hand side per component
+and per grid line.
+
+The tridiagonal matrix only depends on dt, dx and dcoef.  Its LU
+factorization (LAPACK dgttrf from scipy) is kept and only computed again
+when one of them changes, so with a fixed dt it is computed once per axis
+for the whole run.  Each axis is then one dgttrs solve for all right hand
+sides.
+
+The lines are solved on a single patch, so this is not implemented with
+PETSc.
+
+The wall time of each call is appended to times, to compare with the
+hyperbolic step (see also chpde.instrument):
+
+    print(np.mean(solver.step_source.times))
+
+solve(q, dt, dx, axis) does the step along one axis of q[m, i, j, ...].
+"""
+import collections
+import time
+import numpy as np
+
+class ImplicitDiffusion(object):
+    def __init__(self, dcoef, components=None):
+        self.dcoef = dcoef
+        self.components = components
+        self._factors = collections.OrderedDict()
+        self.times = []
+
+    def _dcoef(self, axis):
+        dcoef = np.ravel(self.dcoef)
+        return dcoef[axis] if dcoef.size > 1 else dcoef[0]
+
+    def factor(self, n, r):
+        """
+        LU factorization of the Crank-Nicolson matrix for n cells with
+        r = dcoef dt / (2 dx^2), computed once for each (n, r).
+        """
+        key = (n, r)
+        if key in self._factors:
+            self._factors.move_to_end(key)
+        else:
+            from scipy.linalg import lapack
+            d = np.full(n, 1.0 + 2.0*r)
+            d[0] -= r
+            d[-1] -= r
+            off = np.full(n - 1, -r)
+            dl, d, du, du2, ipiv, info = lapack.dgttrf(off, d, off.copy())
+            if info != 0:
+                raise ValueError('dgttrf failed with info = %d' % info)
+            # The last few: one per axis, the step before an output time is
+            # shorter, and Strang half steps may differ in the last bit
+            if len(self._factors) >= 12:
+                self._factors.popitem(last=False)
+            self._factors[key] = (r, dl, d, du, du2, ipiv)
+        return self._factors[key]
+
+    def solve(self, q, dt, dx, axis=0):
+        """
+        One Crank-Nicolson step of length dt, in place, along axis of the
+        cells of q (axis 0 is the first index after the component).
+        """
+        from scipy.linalg import lapack
+        n = q.shape[axis + 1]
+        if n < 2:
+            return q
+        r = self._dcoef(axis)*dt/(2.0*dx*dx)
+        r, dl, d, du, du2, ipiv = self.factor(n, float(r))
+        m = slice(None) if self.components is None else list(self.components)
+        # Cells first and one column per grid line and component, in
+        # Fortran order for dgttrs
+        a = np.moveaxis(q[m], axis + 1, 0)
+        shape = a.shape
+        a = a.reshape(n, -1)
+        b = np.empty_like(a, order='F')
+        b[1:-1] = a[1:-1] + r*(a[:-2] - 2.0*a[1:-1] + a[2:])
+        b[0] = a[0] + r*(a[1] - a[0])
+        b[-1] = a[-1] + r*(a[-2] - a[-1])
+        x, info = lapack.dgttrs(dl, d, du, du2, ipiv, b, overwrite_b=True)
+        if info != 0:
+            raise ValueError('dgttrs failed with info = %d' % info)
+        q[m] = np.moveaxis(x.reshape(shape), 0, axis + 1)
+        return q
+
+    def __call__(self, solver, state, dt):
+        if type(state).__module__.startswith('clawpack.petclaw'):
+            # Each process would only solve along its own patch
+            raise ValueError('Implicit diffusion is not implemented with PETSc.')
+        start = time.perf_counter()
+        for axis, dx in enumerate(state.grid.delta):
+            self.solve(state.q, dt, dx, axis)
+        self.times.append(time.perf_counter() - start)
@@ -0,0 +1,533 @@
+r"""
+Reading output frames
+=====================
+
+Find the frames in an output directory and read them in order, reading the
+next frames on a background thread while the current one is being plotted:
+
+    from chpde import frames
+    for frame, sol in frames.FrameReader('_output', petsc=False):
+        q = sol.state.q
+        ...
+
+The directory is scanned once for the available frames (files fort.tXXXX
+written by PyClaw and the Fortran codes, or claw.pklXXXX written with
+PETSc), so there is no need to try reading frames until one fails.
+
+PyClaw can only write ascii frames, which are slow to write and to parse.
+binary_output(claw) makes a Controller write frames in the binary64 format
+of the Fortran codes instead: fort.tXXXX and fort.qXXXX are short text
+headers and fort.bXXXX (fort.aXXXX for aux) holds the raw little-endian
+float64 values of each patch in Fortran order.  These frames are read by
+Solution.read(frame, path) as before, and read_frame() maps them into
+memory with np.memmap instead of reading them.
+
+Catalog(path) is an index of the frames in a directory (time, patches,
+min/max of each component of q), written during the run by
+catalog_output(claw) or built once from the frames, so that the frame
+nearest to a given time or colorbar limits over all frames are found
+without reading the frames.
+"""
+import collections
+import concurrent.futures
+import json
+import os
+import queue
+import re
+import threading
+import types
+import weakref
+import numpy as np
+
+def _prefix(petsc, file_prefix):
+    if file_prefix is not None:
+        return file_prefix
+    return 'claw' if petsc else 'fort'
+
+def frame_numbers(path='_output', petsc=False, file_prefix=None):
+    """
+    Sorted list of the frame numbers found in directory path.
+    """
+    prefix = _prefix(petsc, file_prefix)
+    pattern = re.compile(r'^%s\.(t|pkl)(\d+)$' % re.escape(prefix))
+    numbers = set()
+    for name in os.listdir(path):
+        match = pattern.match(name)
+        if match:
+            numbers.add(int(match.group(2)))
+    return sorted(numbers)
+
+def read_frame(frame, path='_output', petsc=False, file_prefix=None,
+               read_aux=False):
+    """
+    Read one frame into a new pyclaw.Solution.  Binary frames are mapped
+    into memory with memmap_frame(), chunked frames are read with
+    chpde.chunked.read_chunked().
+    """
+    from clawpack import pyclaw
+    from clawpack.pyclaw.fileio.ascii import read_t
+    prefix = _prefix(petsc, file_prefix)
+    file_format = None if petsc else read_t(frame, path, prefix)[-1]
+    if file_format in ('binary', 'binary32', 'binary64'):
+        return memmap_frame(frame, path, prefix, read_aux)
+    if file_format == 'chunked':
+        from chpde.chunked import read_chunked
+        return read_chunked(frame, path, prefix, read_aux)
+    sol = pyclaw.Solution()
+    if petsc:
+        sol.read(frame, path, read_aux=read_aux, file_prefix=prefix,
+                 file_format='petsc')
+    else:
+        sol.read(frame, path, read_aux=read_aux, file_prefix=prefix)
+    return sol
+
+#------------------------------------------------------------------------------
+# Binary frames
+#------------------------------------------------------------------------------
+def _frame_file(path, file_prefix, kind, frame):
+    return os.path.join(path, '%s.%s%s' % (file_prefix, kind, str(frame).zfill(4)))
+
+def _write_values(filename, states, name):
+    with open(filename, 'wb') as f:
+        for state in states:
+            # The transpose of a Fortran ordered array is C ordered, and
+            # tofile writes C order
+            np.asarray(getattr(state, name), dtype='<f8').T.tofile(f)
+
+def write_t(solution, frame, path, file_prefix, file_format, write_p=False):
+    """
+    Write the fort.tXXXX file describing a frame, which records its format.
+    """
+    with open(_frame_file(path, file_prefix, 't', frame), 'w') as f:
+        f.write("%18.8e     time\n" % solution.t)
+        f.write("%5i                  num_eqn\n"
+                % (solution.mp if write_p else solution.num_eqn))
+        f.write("%5i                  nstates\n" % len(solution.states))
+        f.write("%5i                  num_aux\n" % solution.num_aux)
+        f.write("%5i                  num_dim\n" % solution.domain.num_dim)
+        f.write("%5i                  num_ghost\n" % 0)
+        f.write("%s                  file_format\n" % file_format)
+
+def write_binary(solution, frame, path='./', file_prefix='fort', write_aux=False,
+                 options={}, write_p=False):
+    """
+    Write a frame in the binary64 format, with the same arguments as the
+    PyClaw writers.  No ghost cells are written.
+    """
+    from clawpack.pyclaw.fileio.ascii import write_patch_header
+    write_t(solution, frame, path, file_prefix, 'binary64', write_p)
+    with open(_frame_file(path, file_prefix, 'q', frame), 'w') as f:
+        for state in solution.states:
+            write_patch_header(f, state.patch)
+    _write_values(_frame_file(path, file_prefix, 'b', frame), solution.states,
+                  'p' if write_p else 'q')
+    if write_aux and solution.num_aux > 0:
+        _write_values(_frame_file(path, file_prefix, 'a', frame),
+                      solution.states, 'aux')
+
+def memmap_frame(frame, path='_output', file_prefix='fort', read_aux=False):
+    """
+    Read a binary frame (written by binary_output or by the Fortran codes)
+    into a new pyclaw.Solution whose q (and aux) are read-only views of the
+    files mapped into memory.
+    """
+    from clawpack import pyclaw
+    from clawpack.pyclaw.fileio.ascii import read_t, read_patch_header
+    t, num_eqn, nstates, num_aux, num_dim, num_ghost, file_format = \
+        read_t(frame, path, file_prefix)
+    dtype = '<f4' if file_format == 'binary32' else '<f8'
+
+    def patch_values(filename, states, num_var):
+        data = np.memmap(filename, dtype=dtype, mode='r')
+        start = 0
+        values = []
+        for state in states:
+            shape = [num_var] + [n + 2*num_ghost for n in state.grid.num_cells]
+            size = int(np.prod(shape))
+            a = data[start:start+size].reshape(shape, order='F')
+            interior = [slice(num_ghost, n+num_ghost) for n in state.grid.num_cells]
+            values.append(a[tuple([slice(None)] + interior)])
+            start += size
+        return values
+
+    states = []
+    with open(_frame_file(path, file_prefix, 'q', frame)) as f:
+        for m in range(nstates):
+            patch = read_patch_header(f, num_dim)
+            state = pyclaw.State(patch, num_eqn, num_aux if read_aux else 0)
+            state.t = t
+            states.append(state)
+    for state, q in zip(states, patch_values(_frame_file(path, file_prefix, 'b', frame),
+                                             states, num_eqn)):
+        state.q = q
+    if read_aux and num_aux > 0:
+        # aux is written once at the start if it does not change
+        filename = _frame_file(path, file_prefix, 'a', frame)
+        if not os.path.exists(filename):
+            filename = _frame_file(path, file_prefix, 'a', 0)
+        for state, aux in zip(states, patch_values(filename, states, num_aux)):
+            state.aux = aux
+    sol = pyclaw.Solution(states, pyclaw.Domain([s.patch for s in states]))
+    sol.t = t
+    return sol
+
+class FrameReader(object):
+    """
+    Iterate over (frame, solution) for all frames in path, or for the given
+    list of frames, keeping up to prefetch frames read ahead.
+    """
+    def __init__(self, path='_output', petsc=False, file_prefix=None,
+                 read_aux=False, frames=None, prefetch=2):
+        self.path = path
+        self.petsc = petsc
+        self.file_prefix = file_prefix
+        self.read_aux = read_aux
+        if frames is None:
+            frames = frame_numbers(path, petsc, file_prefix)
+        self.frames = list(frames)
+        self.prefetch = max(prefetch, 1)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def read(self, frame):
+        return read_frame(frame, self.path, self.petsc, self.file_prefix,
+                          self.read_aux)
+
+    def __iter__(self):
+        pending = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            try:
+                for frame in self.frames:
+                    pending.append((frame, pool.submit(self.read, frame)))
+                    if len(pending) > self.prefetch:
+                        current, future = pending.popleft()
+                        yield current, future.result()
+                while pending:
+                    current, future = pending.popleft()
+                    yield current, future.result()
+            finally:
+                # Loop left early: do not read the frames not yet started
+                for frame, future in pending:
+                    future.cancel()
+
+#------------------------------------------------------------------------------
+# Frame catalog
+#------------------------------------------------------------------------------
+def _catalog_file(path, file_prefix):
+    return os.path.join(path, '%s.catalog.json' % file_prefix)
+
+def _header_file(path, file_prefix, frame):
+    filename = _frame_file(path, file_prefix, 't', frame)
+    if not os.path.exists(filename):
+        filename = _frame_file(path, file_prefix, 'pkl', frame)
+    return filename
+
+def _catalog_entry(sol, frame, file_format, num_ghost=0):
+    """
+    Time, patches, offsets of the patches in the binary data file and
+    min/max of each component of q for one frame.
+    """
+    qmin = np.min([s.q.reshape(s.q.shape[0], -1).min(axis=1) for s in sol.states], axis=0)
+    qmax = np.max([s.q.reshape(s.q.shape[0], -1).max(axis=1) for s in sol.states], axis=0)
+    offsets = None
+    if file_format.startswith('binary'):
+        itemsize = 4 if file_format == 'binary32' else 8
+        sizes = [s.q.shape[0]*int(np.prod([n + 2*num_ghost for n in s.grid.num_cells]))
+                 for s in sol.states]
+        offsets = [itemsize*int(n) for n in np.cumsum([0] + sizes[:-1])]
+    return {'frame'      : frame,
+            't'          : float(sol.t),
+            'file_format': file_format,
+            'num_eqn'    : int(sol.states[0].q.shape[0]),
+            'num_cells'  : [[int(n) for n in s.grid.num_cells] for s in sol.states],
+            'lower'      : [[float(x) for x in s.grid.lower] for s in sol.states],
+            'upper'      : [[float(x) for x in s.grid.upper] for s in sol.states],
+            'offsets'    : offsets,
+            'qmin'       : [float(v) for v in qmin],
+            'qmax'       : [float(v) for v in qmax]}
+
+def _save_catalog(filename, entries):
+    # Write to a temporary file and rename, so that readers never see a
+    # partial file
+    tmp = filename + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'frames': [entries[n] for n in sorted(entries)]}, f, indent=0)
+    os.replace(tmp, filename)
+
+class Catalog(object):
+    """
+    Index of the frames in an output directory, stored in fort.catalog.json
+    (claw.catalog.json for PETSc output):
+
+        cat = frames.Catalog('_output')
+        frame = cat.nearest(0.37)       # frame closest to t = 0.37
+        qmin, qmax = cat.limits(0)      # range of q[0] over all frames
+
+    The catalog is written during the run by catalog_output(); frames that
+    are missing from it, or were written again since, are read and added
+    when the Catalog is created.  The output directory is not written to
+    unless save is True, in which case the catalog file is updated too, so
+    that the next Catalog does not read these frames again.
+    """
+    def __init__(self, path='_output', petsc=False, file_prefix=None, update=True,
+                 save=False):
+        self.path = path
+        self.petsc = petsc
+        self.save = save
+        self.file_prefix = _prefix(petsc, file_prefix)
+        self.filename = _catalog_file(path, self.file_prefix)
+        self.entries = {}
+        if os.path.exists(self.filename):
+            with open(self.filename) as f:
+                self.entries = {e['frame']: e for e in json.load(f)['frames']}
+        if update:
+            self.update()
+        self._index()
+
+    def update(self):
+        """
+        Add the frames that are not in the catalog or have changed, and
+        remove the frames that no longer exist.
+        """
+        from clawpack.pyclaw.fileio.ascii import read_t
+        numbers = frame_numbers(self.path, self.petsc, self.file_prefix)
+        changed = set(self.entries) - set(numbers)
+        for n in changed:
+            del self.entries[n]
+        for n in numbers:
+            mtime = os.path.getmtime(_header_file(self.path, self.file_prefix, n))
+            if n in self.entries and self.entries[n].get('mtime') == mtime:
+                continue
+            sol = read_frame(n, self.path, self.petsc, self.file_prefix)
+            if self.petsc:
+                file_format, num_ghost = 'petsc', 0
+            else:
+                header = read_t(n, self.path, self.file_prefix)
+                file_format, num_ghost = header[-1], header[-2]
+            self.entries[n] = _catalog_entry(sol, n, file_format, num_ghost)
+            self.entries[n]['mtime'] = mtime
+            changed.add(n)
+        if changed and self.save:
+            _save_catalog(self.filename, self.entries)
+        self._index()
+
+    def _index(self):
+        self.frames = sorted(self.entries)
+        self.times = np.array([self.entries[n]['t'] for n in self.frames])
+        self.qmin = np.array([self.entries[n]['qmin'] for n in self.frames])
+        self.qmax = np.array([self.entries[n]['qmax'] for n in self.frames])
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame):
+        return frame in self.entries
+
+    def __getitem__(self, frame):
+        return self.entries[frame]
+
+    def nearest(self, t):
+        """
+        Number of the frame with time closest to t.
+        """
+        if not self.frames:
+            raise ValueError('No frames in %s' % self.path)
+        i = np.argmin(np.abs(self.times - t))
+        return self.frames[i]
+
+    def limits(self, m=0, frames=None):
+        """
+        (min, max) of q[m] over all frames, or over the given frames.
+        """
+        if frames is None:
+            rows = slice(None)
+        else:
+            rows = [self.frames.index(n) for n in frames]
+        return float(self.qmin[rows, m].min()), float(self.qmax[rows, m].max())
+
+#------------------------------------------------------------------------------
+# Output of a Controller
+#------------------------------------------------------------------------------
+# binary_output, catalog_output, async_output, chunked.chunked_output and
+# reduced.reduced_output replace the write method of claw.solution by
+# _write, once, and record what to do on the solution.  The Controller deep
+# copies the solution for claw.frames, which keeps the method bound to the
+# copy, so the writer threads (and reductions) are kept outside of it.
+_writers = weakref.WeakKeyDictionary()
+# Entries of the catalogs being written, by file name; only the latest few
+# are kept, the others are read again from their file when needed
+_catalogs = collections.OrderedDict()
+
+def _install(solution):
+    if not isinstance(solution.__dict__.get('write'), types.MethodType) \
+       or solution.__dict__['write'].__func__ is not _write:
+        solution.write = types.MethodType(_write, solution)
+
+def _write(self, frame, path='./', file_format='ascii', file_prefix=None,
+           write_aux=False, options={}, write_p=False):
+    from chpde import reduced
+    if self in reduced._reductions and not write_p:
+        # Computed here, from the current solution
+        reduced.write_reductions(self, int(str(frame)), path)
+    if file_format == 'reduced':
+        return
+    writer = _writers.get(self)
+    if writer is not None:
+        # The Controller passes a FrameCounter, which it increments later
+        writer.submit(_snapshot(self, write_aux or write_p), int(str(frame)), path,
+                      file_format, file_prefix, write_aux, options, write_p)
+    else:
+        _write_now(self, frame, path, file_format, file_prefix, write_aux,
+                   options, write_p)
+
+def _write_now(solution, frame, path, file_format, file_prefix, write_aux,
+               options, write_p):
+    if file_format == 'binary64':
+        os.makedirs(path, exist_ok=True)
+        write_binary(solution, frame, path, file_prefix or 'fort', write_aux,
+                     options, write_p)
+    elif file_format == 'chunked':
+        from chpde.chunked import write_chunked
+        os.makedirs(path, exist_ok=True)
+        write_chunked(solution, frame, path, file_prefix or 'fort', write_aux,
+                      options, write_p)
+    else:
+        type(solution).write(solution, frame, path, file_format, file_prefix,
+                             write_aux, options, write_p)
+    if solution.__dict__.get('_catalog') and not write_p:
+        prefix = file_prefix or ('claw' if file_format == 'petsc' else 'fort')
+        _add_to_catalog(solution, int(str(frame)), path, prefix, file_format)
+
+def _add_to_catalog(solution, frame, path, file_prefix, file_format):
+    filename = _catalog_file(path, file_prefix)
+    if filename in _catalogs:
+        _catalogs.move_to_end(filename)
+    else:
+        entries = {}
+        if frame > 0 and os.path.exists(filename):
+            with open(filename) as f:
+                entries = {e['frame']: e for e in json.load(f)['frames']}
+        _catalogs[filename] = entries
+        while len(_catalogs) > 4:
+            _catalogs.popitem(last=False)
+    entries = _catalogs[filename]
+    # A new run (or a restart) replaces the frames from here on
+    for n in [n for n in entries if n >= frame]:
+        del entries[n]
+    entry = _catalog_entry(solution, frame, file_format)
+    entry['mtime'] = os.path.getmtime(_header_file(path, file_prefix, frame))
+    entries[frame] = entry
+    _save_catalog(filename, entries)
+
+def binary_output(claw):
+    """
+    Make the Controller claw write its frames with write_binary().
+    """
+    _install(claw.solution)
+    claw.output_format = 'binary64'
+
+def catalog_output(claw):
+    """
+    Make the Controller claw add each frame it writes to the catalog of
+    its output directory.
+    """
+    _install(claw.solution)
+    claw.solution._catalog = True
+
+def _snapshot(solution, copy_aux):
+    """
+    Copy of solution for writing, with its own copy of q (and of aux and p
+    if they are written).
+    """
+    def shallow_copy(obj):
+        # Solution.__copy__ does not work
+        new = object.__new__(type(obj))
+        new.__dict__.update(obj.__dict__)
+        return new
+    snap = shallow_copy(solution)
+    snap.states = []
+    for state in solution.states:
+        s = shallow_copy(state)
+        s.q = state.q.copy('F')
+        if copy_aux and state.aux is not None:
+            s.aux = state.aux.copy('F')
+        if copy_aux and getattr(state, 'p', None) is not None:
+            s.p = state.p.copy('F')
+        s.problem_data = dict(state.problem_data)
+        snap.states.append(s)
+    return snap
+
+class AsyncWriter(object):
+    """
+    Thread writing frames from a bounded queue.  submit() blocks while
+    max_pending frames are waiting, and errors in the thread are raised
+    by the next submit() or flush().
+    """
+    def __init__(self, max_pending=2):
+        self.queue = queue.Queue(max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is not None and self.error is None:
+                    _write_now(*job)
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+            if job is None:
+                return
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, *job):
+        self._check()
+        self.queue.put(job)
+
+    def flush(self):
+        """
+        Wait until all submitted frames are written.
+        """
+        self.queue.join()
+        self._check()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self._check()
+
+def async_output(claw, max_pending=2):
+    """
+    Make the Controller claw write its frames on a separate thread, so that
+    time stepping continues while a frame is written.  At most max_pending
+    copies of the solution wait to be written; claw.run() returns when all
+    frames are written.  The files are the same as without async_output.
+
+    The Fortran kernels do not release the GIL, so the overlap is with the
+    writes to disk; this helps most with binary_output.  The writer thread
+    is started by claw.run() and stopped when it returns.  Not implemented
+    with PETSc, where q is a view of the PETSc vector.
+    """
+    if type(claw.solution).__module__.startswith('clawpack.petclaw'):
+        raise ValueError('Asynchronous output is not implemented with PETSc.')
+    _install(claw.solution)
+    run = claw.run
+    def run_and_flush():
+        writer = _writers[claw.solution] = AsyncWriter(max_pending)
+        try:
+            return run()
+        finally:
+            try:
+                writer.flush()
+            finally:
+                _writers.pop(claw.solution, None)
+                writer.close()
+    claw.run = run_and_flush
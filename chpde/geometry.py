@@ -0,0 +1,313 @@
+r"""
+Volume fractions of shapes on PyClaw grids
+==========================================
+
+Compute the fraction of each cell of a 2D PyClaw grid that lies inside a
+shape, for all cells in one pass:
+
+    circle_fraction(grid, center, radius)
+    polygon_fraction(grid, vertices)
+    levelset_fraction(grid, phi)
+
+On a Cartesian grid circles and polygons are integrated exactly.  Level sets
+(phi(x,y) < 0 inside) and all shapes on a mapped grid (grid.mapc2p) use a
+piecewise linear reconstruction of phi on refine x refine sub-cells.
+
+Results are cached on the grid (number of cells, extent, mapping) and the
+shape parameters, so a parameter sweep that rebuilds the same grid computes
+each fraction only once.  The cache keeps the CACHE_SIZE most recently used
+fractions; a function (phi, mapc2p) is part of the key by identity, so pass
+the same function object to share an entry.  The returned arrays are
+read-only.
+
+Metrics of mapped grids (normals, edge length ratios, capacity) that are
+expensive to compute can be kept on disk between runs with
+
+    cached_metrics(compute, grid)
+
+The disk cache is opt-in: it is used when $CHPDE_CACHE names its directory
+(or a directory is passed); otherwise compute(grid) is called every time.
+"""
+import collections
+import hashlib
+import inspect
+import os
+import tempfile
+import numpy as np
+
+CACHE_SIZE = 32
+_cache = collections.OrderedDict()
+
+def clear_cache():
+    _cache.clear()
+
+def _is_mapped(grid):
+    from clawpack.pyclaw.geometry import identity_map
+    return grid.mapc2p not in identity_map.values()
+
+def _cached(key, grid, compute):
+    mapc2p = grid.mapc2p if _is_mapped(grid) else None
+    key = key + (tuple(grid.num_cells), tuple(grid.lower), tuple(grid.upper),
+                 mapc2p)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    frac = np.clip(compute(), 0.0, 1.0)
+    frac.flags.writeable = False
+    _cache[key] = frac
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return frac
+
+def _cell_areas(F):
+    """
+    Cell integrals from an array F of antiderivatives at the grid nodes.
+    """
+    return F[1:,1:] - F[:-1,1:] - F[1:,:-1] + F[:-1,:-1]
+
+#------------------------------------------------------------------------------
+# Circles
+#------------------------------------------------------------------------------
+def _circle_strip(x, c, radius):
+    """
+    Integral of min(sqrt(radius**2-t**2),c) for t from -radius to x, with
+    c >= 0 and coordinates relative to the center of the circle.
+    """
+    def prim(t):
+        s = np.sqrt((radius-t)*(radius+t))
+        return 0.5*(t*s + radius**2*np.arctan2(t,s))
+    x = np.clip(x, -radius, radius)
+    w = np.sqrt(np.maximum(radius**2 - c**2, 0.0))
+    xw = np.clip(x, -w, w)
+    return prim(x) - prim(-radius) - (prim(xw) - prim(-w) - c*(xw + w))
+
+def _circle_exact(grid, center, radius):
+    xn = grid.dimensions[0].nodes - center[0]
+    yn = grid.dimensions[1].nodes - center[1]
+    # Area of the disk in {x' < x, y' < y}, up to terms that cancel in
+    # _cell_areas
+    X, Y = np.meshgrid(xn, yn, indexing='ij')
+    F = np.sign(Y)*_circle_strip(X, np.abs(Y), radius)
+    return _cell_areas(F)/np.prod(grid.delta)
+
+def circle_fraction(grid, center, radius, refine=4):
+    """
+    Fraction of each cell inside the circle of given center and radius.
+    """
+    center = tuple(center)
+    def compute():
+        if not _is_mapped(grid):
+            return _circle_exact(grid, center, radius)
+        def phi(x, y):
+            return np.sqrt((x-center[0])**2 + (y-center[1])**2) - radius
+        return _levelset(grid, phi, refine, distance=True)
+    return _cached(('circle', center, radius, refine), grid, compute)
+
+#------------------------------------------------------------------------------
+# Polygons
+#------------------------------------------------------------------------------
+def _positive_mean(h1, h2):
+    """
+    Mean of max(h,0) for h varying linearly from h1 to h2.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mixed = np.maximum(h1, h2)**2 / (2.0*np.abs(h1 - h2))
+    return np.where(np.minimum(h1, h2) >= 0.0, 0.5*(h1 + h2),
+                    np.where(np.maximum(h1, h2) <= 0.0, 0.0, mixed))
+
+def _polygon_exact(grid, vertices):
+    xv, yv = vertices[:,0], vertices[:,1]
+    orient = np.sign(np.sum(xv*np.roll(yv,-1) - np.roll(xv,-1)*yv))
+    a = grid.dimensions[0].nodes[:,np.newaxis]
+    b = grid.dimensions[1].nodes[np.newaxis,:]
+    # Area of the polygon in {x < a, y < b} is -(oriented) integral of
+    # min(y,b) dx around its boundary, restricted to x < a
+    F = np.zeros((a.size, b.size))
+    for k in range(len(xv)):
+        x1, y1 = xv[k], yv[k]
+        x2, y2 = xv[(k+1) % len(xv)], yv[(k+1) % len(xv)]
+        if x1 == x2:
+            continue
+        if x1 > x2:
+            xl, yl, xh, yh, sgn = x2, y2, x1, y1, -1.0
+        else:
+            xl, yl, xh, yh, sgn = x1, y1, x2, y2, 1.0
+        xe = np.clip(a, xl, xh)
+        ye = yl + (yh - yl)*(xe - xl)/(xh - xl)
+        L = xe - xl
+        F += sgn*L*(0.5*(yl + ye) - _positive_mean(yl - b, ye - b))
+    return -orient*_cell_areas(F)/np.prod(grid.delta)
+
+def _polygon_distance(x, y, vertices):
+    """
+    Signed distance to the polygon boundary, negative inside.
+    """
+    dist = np.full(x.shape, np.inf)
+    inside = np.zeros(x.shape, dtype=bool)
+    nv = len(vertices)
+    for k in range(nv):
+        x1, y1 = vertices[k]
+        x2, y2 = vertices[(k+1) % nv]
+        ex, ey = x2 - x1, y2 - y1
+        s = np.clip(((x-x1)*ex + (y-y1)*ey)/(ex**2 + ey**2), 0.0, 1.0)
+        dist = np.minimum(dist, np.hypot(x - x1 - s*ex, y - y1 - s*ey))
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xcross = x1 + (y - y1)*ex/ey
+        inside ^= crosses & (x < xcross)
+    return np.where(inside, -dist, dist)
+
+def polygon_fraction(grid, vertices, refine=4):
+    """
+    Fraction of each cell inside the simple polygon with the given vertices,
+    an (n,2) sequence of (x,y) points in either orientation.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    def compute():
+        if not _is_mapped(grid):
+            return _polygon_exact(grid, vertices)
+        def phi(x, y):
+            return _polygon_distance(x, y, vertices)
+        return _levelset(grid, phi, refine, distance=True)
+    key = ('polygon', tuple(map(tuple, vertices)), refine)
+    return _cached(key, grid, compute)
+
+#------------------------------------------------------------------------------
+# Level sets
+#------------------------------------------------------------------------------
+def _triangle_fraction(f1, f2, f3):
+    """
+    Fraction of a triangle where the linear interpolant of the vertex
+    values is negative.
+    """
+    a, b, c = np.sort(np.stack((f1, f2, f3)), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        upper = 1.0 - c**2/((c - a)*(c - b))
+        lower = a**2/((b - a)*(c - a))
+    return np.where(c <= 0.0, 1.0, np.where(a >= 0.0, 0.0,
+                    np.where(b <= 0.0, upper, lower)))
+
+def _triangle_area(x1, y1, x2, y2, x3, y3):
+    return 0.5*np.abs((x2-x1)*(y3-y1) - (x3-x1)*(y2-y1))
+
+def _levelset(grid, phi, refine, distance=False, block=4096):
+    mx, my = grid.num_cells
+    dx, dy = grid.delta
+    mapped = _is_mapped(grid)
+    frac = np.empty((mx, my))
+    if distance:
+        # phi is a signed distance, so only cells closer to the interface
+        # than the distance from their center to their corners are cut
+        Xc, Yc = grid.p_centers
+        Xn, Yn = grid.p_nodes
+        f = phi(Xc, Yc)
+        radius = np.zeros((mx, my))
+        for sx in (slice(None,-1), slice(1,None)):
+            for sy in (slice(None,-1), slice(1,None)):
+                radius = np.maximum(radius, np.hypot(Xn[sx,sy]-Xc, Yn[sx,sy]-Yc))
+        frac[...] = f < 0.0
+        ii, jj = np.nonzero(np.abs(f) < radius)
+    else:
+        ii, jj = np.indices((mx, my)).reshape(2, -1)
+
+    s = np.linspace(0.0, 1.0, refine+1)
+    corners = [(slice(None,-1),slice(None,-1)), (slice(1,None),slice(None,-1)),
+               (slice(1,None),slice(1,None)), (slice(None,-1),slice(1,None))]
+    # Sub-cells of blocks of cells, with shape (cells, refine+1, refine+1)
+    for k in range(0, len(ii), block):
+        i, j = ii[k:k+block], jj[k:k+block]
+        X = grid.lower[0] + dx*(i[:,np.newaxis,np.newaxis] + s[:,np.newaxis])
+        Y = grid.lower[1] + dy*(j[:,np.newaxis,np.newaxis] + s)
+        X, Y = X + 0.0*Y, Y + 0.0*X
+        if mapped:
+            X, Y = grid.mapc2p(X, Y)
+        f = phi(X, Y)
+        x00, x10, x11, x01 = [X[(slice(None),)+c] for c in corners]
+        y00, y10, y11, y01 = [Y[(slice(None),)+c] for c in corners]
+        f00, f10, f11, f01 = [f[(slice(None),)+c] for c in corners]
+        area1 = _triangle_area(x00, y00, x10, y10, x11, y11)
+        area2 = _triangle_area(x00, y00, x11, y11, x01, y01)
+        inside = area1*_triangle_fraction(f00, f10, f11) \
+               + area2*_triangle_fraction(f00, f11, f01)
+        frac[i,j] = inside.sum(axis=(1,2))/(area1 + area2).sum(axis=(1,2))
+    return frac
+
+def levelset_fraction(grid, phi, refine=4):
+    """
+    Fraction of each cell where phi(x,y) < 0.  phi is called with arrays of
+    physical coordinates and must be vectorized.
+    """
+    return _cached(('levelset', phi, refine), grid,
+                   lambda: _levelset(grid, phi, refine))
+
+#------------------------------------------------------------------------------
+# Disk cache for grid metrics
+#------------------------------------------------------------------------------
+def cache_dir():
+    return os.environ.get('CHPDE_CACHE') or None
+
+def _source(f):
+    try:
+        return inspect.getsource(f)
+    except (OSError, TypeError):
+        pass
+    # No source (e.g. defined in an interactive session): use the bytecode,
+    # so that two lambdas do not share the key '<lambda>'
+    code = getattr(f, '__code__', None)
+    if code is None:
+        return repr(f)
+    return repr((code.co_code, code.co_consts, code.co_names,
+                 getattr(f, '__defaults__', None)))
+
+def metrics_key(compute, grid, key=(), funcs=()):
+    """
+    Hash of the source of compute, of the grid mapping and of funcs, and of
+    the grid dimensions and key.
+    """
+    h = hashlib.sha1()
+    for f in (compute, grid.mapc2p) + tuple(funcs):
+        h.update(_source(f).encode())
+    h.update(repr((tuple(grid.num_cells), tuple(grid.lower),
+                   tuple(grid.upper), key)).encode())
+    return h.hexdigest()
+
+def cached_metrics(compute, grid, key=(), funcs=(), directory=None):
+    """
+    Return compute(grid), an array or a tuple of arrays, loading it from the
+    cache directory (directory, or $CHPDE_CACHE; no cache if neither is set)
+    if it was computed before for the same grid.
+
+    The cache entry depends on the source code of compute and grid.mapc2p.
+    Pass other functions they call as funcs, and any data they use (e.g.
+    module level parameters) as key, so that changing them invalidates the
+    entry.
+    """
+    if directory is None:
+        directory = cache_dir()
+    if directory is None:
+        return compute(grid)
+    path = os.path.join(directory, '%s-%s.npz'
+                        % (compute.__name__, metrics_key(compute, grid, key, funcs)))
+    if os.path.exists(path):
+        with np.load(path) as data:
+            arrays = [data['arr_%d' % i] for i in range(len(data.files)-1)]
+            if data['single']:
+                return arrays[0]
+            return tuple(arrays)
+
+    result = compute(grid)
+    single = isinstance(result, np.ndarray)
+    arrays = [result] if single else list(result)
+
+    # Write to a temporary file and rename, so that runs sharing the cache
+    # never see a partial file
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.npz', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, *arrays, single=single)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return result
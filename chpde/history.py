@@ -0,0 +1,127 @@
+r"""
+Bounded history of output frames
+================================
+
+With claw.keep_copy = True the Controller appends a copy of the solution
+to claw.frames at every output time, which for large 2D runs can use all
+the memory.  Replace the list by a FrameHistory to limit what is kept:
+
+    claw.keep_copy = True
+    claw.frames = history.FrameHistory(last=3, spill=True)
+
+or, the same, history.bound_frames(claw) (as the 2D examples do with
+frame_history=True).  The arguments are
+
+    every       store only frames 0, every, 2*every, ... and the latest one
+    last        keep only frames from the latest last output times in
+                memory; older ones are spilled (see below) or dropped
+    spill       write frames leaving memory to a file and map them back
+                with np.memmap: True for a temporary file, or a file name
+    components  store only these components of q (q then has
+                len(components) components, in this order)
+
+claw.frames[i] is still the solution at output frame i, so existing code
+using claw.frames[i].q keeps working for the frames that are stored.
+Accessing a frame that was not stored raises IndexError, and iterating
+over the history skips it.  aux is written to the spill file only when it
+differs from the aux of the previous spilled frame.
+"""
+import tempfile
+import numpy as np
+
+class FrameHistory(object):
+    def __init__(self, last=None, every=1, spill=None, components=None):
+        self.last = last
+        self.every = every
+        self.components = components
+        self.spill = spill
+        self._frames = []
+        self._file = None
+        self._aux = {}
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        frame = self._frames[i]
+        if frame is None:
+            raise IndexError('Frame %d was not kept' % (i % len(self)))
+        return frame
+
+    def __iter__(self):
+        return (frame for frame in self._frames if frame is not None)
+
+    def index(self, frame):
+        for i, f in enumerate(self._frames):
+            if f is frame:
+                return i
+        raise ValueError('Frame not in history')
+
+    def append(self, solution):
+        i = len(self._frames)
+        if self.components is not None:
+            for state in solution.states:
+                state.q = state.q[list(self.components)].copy('F')
+        self._frames.append(solution)
+        # The latest frame is always kept
+        if i > 0 and (i-1) % self.every != 0:
+            self._frames[i-1] = None
+
+        if self.last is not None and i >= self.last:
+            k = i - self.last
+            if self._frames[k] is not None:
+                if self.spill:
+                    self._spill(self._frames[k])
+                else:
+                    self._frames[k] = None
+
+    def _spill(self, solution):
+        if self._file is None:
+            if self.spill is True:
+                self._file = tempfile.TemporaryFile()
+            else:
+                self._file = open(self.spill, 'w+b')
+        for n, state in enumerate(solution.states):
+            state.q = self._write(state.q)
+            if state.aux is not None:
+                aux = self._aux.get(n)
+                if (aux is None or aux.shape != state.aux.shape
+                        or not np.array_equal(aux, state.aux)):
+                    aux = self._aux[n] = self._write(state.aux)
+                state.aux = aux
+
+    def _write(self, array):
+        """
+        Append array to the spill file and return a read-only view of it.
+        """
+        array = np.asfortranarray(array)
+        f = self._file
+        f.seek(0, 2)
+        offset = f.tell()
+        # The transpose of a Fortran ordered array is C ordered
+        array.T.tofile(f)
+        f.flush()
+        return np.memmap(f, dtype=array.dtype, mode='r', offset=offset,
+                         shape=array.shape, order='F')
+
+    def close(self):
+        """
+        Drop all frames and close the spill file.
+        """
+        self._frames = []
+        self._aux = {}
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def bound_frames(claw, last=3, spill=True, **kwargs):
+    """
+    Keep the latest last frames of claw in memory and spill the older ones
+    to a temporary file (or drop them with spill=False).  Returns the
+    FrameHistory.
+    """
+    claw.keep_copy = True
+    claw.frames = FrameHistory(last=last, spill=spill, **kwargs)
+    return claw.frames
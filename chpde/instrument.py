@@ -0,0 +1,158 @@
+r"""
+Timing of the parts of a PyClaw time step
+=========================================
+
+Attach a profiler to the Controller returned by setup(), e.g.
+
+    claw = pyclaw.Controller()
+    ...
+    instrument.attach(claw, trace='trace.json')
+    return claw
+
+Each time step is then split into
+
+    bc          boundary conditions (_apply_bcs), excluding user callbacks
+    user_bc     Python callbacks user_bc_lower/upper, user_aux_bc_lower/upper
+    hyperbolic  the Fortran kernels (Riemann solves, limiting, updates)
+    source      step_source (ClawSolver) or dq_src (SharpClawSolver)
+    other       the rest of the step (dt selection, RK stage arithmetic)
+
+and the time spent writing output frames is counted as output.  The times
+are exclusive: time in user_bc is not included in bc, etc.  At the end of
+claw.run() a summary table is printed and, if trace is given, a trace is
+written that can be opened in chrome://tracing or https://ui.perfetto.dev.
+A relative trace file name is taken relative to claw.outdir, or to the
+current directory if the run writes no output (output_format None).
+
+The hooks wrap the solver methods on the instance, so nothing changes for
+runs without a profiler.
+"""
+import json
+import os
+import time
+import numpy as np
+
+CATEGORIES = ('bc', 'user_bc', 'hyperbolic', 'source', 'other', 'output')
+
+class StepProfiler(object):
+    """
+    Exclusive wall time per category, per time step, and a list of trace
+    events.  Use attach() to create one.
+    """
+    def __init__(self, trace=None, max_events=200000):
+        self.trace = trace
+        self.max_events = max_events
+        self.totals = dict.fromkeys(CATEGORIES, 0.0)
+        self.calls = dict.fromkeys(CATEGORIES, 0)
+        self.steps = []         # exclusive times of each step, per category
+        self.events = []
+        self.num_cells = 0
+        self._stack = []
+        self._step = None
+        self._t0 = time.perf_counter()
+
+    def wrap(self, category, fun):
+        """
+        Return fun wrapped so that its wall time is counted in category.
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            self._stack.append(0.0)
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                children = self._stack.pop()
+                self._record(category, start, end, end - start - children)
+        timed.__wrapped__ = fun
+        return timed
+
+    def _record(self, category, start, end, exclusive):
+        if self._stack:
+            self._stack[-1] += end - start
+        self.totals[category] += exclusive
+        self.calls[category] += 1
+        if self._step is not None:
+            self._step[category] += exclusive
+        if len(self.events) < self.max_events:
+            self.events.append({'name': category, 'ph': 'X', 'pid': 0, 'tid': 0,
+                                'ts': 1e6*(start - self._t0),
+                                'dur': 1e6*(end - start)})
+
+    def wrap_step(self, fun):
+        def step(*args, **kwargs):
+            self._step = dict.fromkeys(CATEGORIES, 0.0)
+            try:
+                return self.wrap('other', fun)(*args, **kwargs)
+            finally:
+                self.steps.append(self._step)
+                self._step = None
+        step.__wrapped__ = fun
+        return step
+
+    def step_times(self, category):
+        """
+        Array of the exclusive time spent in category in each step.
+        """
+        return np.array([s[category] for s in self.steps])
+
+    def summary(self):
+        total = sum(self.totals.values())
+        num_steps = len(self.steps)
+        lines = ['%-12s %10s %7s %12s %8s' % ('', 'time (s)', '%', 'per step', 'calls')]
+        for c in CATEGORIES:
+            lines.append('%-12s %10.4f %7.1f %12.3e %8d'
+                         % (c, self.totals[c], 100.0*self.totals[c]/max(total, 1e-300),
+                            self.totals[c]/max(num_steps, 1), self.calls[c]))
+        lines.append('%-12s %10.4f %7.1f' % ('total', total, 100.0))
+        if num_steps > 0 and total > 0.0:
+            lines.append('%d steps, %d cells, %.3e cell updates per second'
+                         % (num_steps, self.num_cells,
+                            num_steps*self.num_cells/total))
+        return '\n'.join(lines)
+
+    def write_trace(self, filename):
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.events,
+                       'displayTimeUnit': 'ms'}, f)
+
+def attach(claw, trace=None, verbose=True):
+    """
+    Time the steps of claw.solver and the output of claw.  Call this after
+    the solver (including its source terms and boundary conditions) has
+    been set up.  Returns the StepProfiler.
+    """
+    prof = StepProfiler(trace)
+    solver = claw.solver
+
+    solver.step = prof.wrap_step(solver.step)
+    solver._apply_bcs = prof.wrap('bc', solver._apply_bcs)
+    for name in ('user_bc_lower', 'user_bc_upper',
+                 'user_aux_bc_lower', 'user_aux_bc_upper'):
+        if getattr(solver, name, None) is not None:
+            setattr(solver, name, prof.wrap('user_bc', getattr(solver, name)))
+    for name in ('step_hyperbolic', 'dq_hyperbolic'):
+        if hasattr(solver, name):
+            setattr(solver, name, prof.wrap('hyperbolic', getattr(solver, name)))
+    for name in ('step_source', 'dq_src'):
+        if getattr(solver, name, None) is not None:
+            setattr(solver, name, prof.wrap('source', getattr(solver, name)))
+    claw.solution.write = prof.wrap('output', claw.solution.write)
+
+    run = claw.run
+    def run_and_report():
+        status = run()
+        prof.num_cells = int(np.prod(claw.solution.state.grid.num_cells))
+        if verbose:
+            print(prof.summary())
+        if prof.trace is not None:
+            filename = prof.trace
+            if claw.output_format is not None:
+                filename = os.path.join(claw.outdir, filename)
+            if os.path.dirname(filename):
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+            prof.write_trace(filename)
+        return status
+    claw.run = run_and_report
+    claw.profiler = prof
+    return prof
@@ -0,0 +1,124 @@
+r"""
+Layered media for 1D acoustics
+==============================
+
+Densities of n layers, generated with array operations so that 10^6
+layers take a fraction of a second:
+
+    rho = layered.periodic(n, (3.0, 1.0))             # 3, 1, 3, 1, ...
+    rho = layered.random(n, 1.0, 2.0, seed=0)          # uniform in [1, 2)
+    rho = layered.markov(n, (1.0, 3.0), [[0.9, 0.1],   # Markov chain with
+                                         [0.2, 0.8]],  # transition matrix
+                         seed=0)
+    layered.set_aux(state, rho, width=1.0)
+
+set_aux fills the aux array of variable coefficient acoustics with the
+impedance Z = rho c and the sound speed c of the layer of each cell, layer
+k being x0 + k width < x < x0 + (k+1) width as in acoustics_1d_layered/
+setaux.f.  Cells beyond the last layer take the last layer.
+
+For an ensemble of runs on the same medium, medium() generates it in the
+first run and writes it as a .npy file; the next runs (e.g. the processes of
+chpde.sweep) map the file into memory instead of generating it again:
+
+    rho = layered.medium('medium.npy', 'random', 10**6, seed=0)
+
+The generator and its arguments are written next to it (medium.npy.json)
+and checked when the file is reused, so a medium generated with other
+parameters raises ValueError instead of being returned.
+
+The Fortran code in acoustics_1d_layered reads setprob.rho, or the binary
+setprob.rho.bin if it exists, which write_fortran() writes.
+"""
+import json
+import os
+import numpy as np
+
+def periodic(n, values=(3.0, 1.0)):
+    """
+    values repeated to n layers.
+    """
+    return np.resize(np.asarray(values, dtype=float), n)
+
+def random(n, low=1.0, high=2.0, seed=None):
+    """
+    n densities uniformly distributed in [low, high).
+    """
+    return np.random.default_rng(seed).uniform(low, high, n)
+
+def markov(n, values, transition, seed=None, start=0):
+    """
+    n layers whose densities are values[k], with k a Markov chain starting
+    at start: transition[j][k] is the probability that a layer with values[j]
+    is followed by one with values[k].
+    """
+    values = np.asarray(values, dtype=float)
+    cdf = np.cumsum(np.asarray(transition, dtype=float), axis=1)
+    u = np.random.default_rng(seed).random(n - 1)
+    # steps[i, j]: state after layer i given state j at layer i
+    steps = (u[:, None, None] >= cdf[None, :, :-1]).sum(axis=2)
+    # Compose the steps with a prefix scan: after the pass with shift s,
+    # steps[i] is the composition of the steps i-2s+1, ..., i
+    shift = 1
+    while shift < n - 1:
+        steps[shift:] = np.take_along_axis(steps[shift:], steps[:-shift], axis=1)
+        shift *= 2
+    states = np.empty(n, dtype=int)
+    states[0] = start
+    states[1:] = steps[:, start]
+    return values[states]
+
+GENERATORS = {'periodic': periodic, 'random': random, 'markov': markov}
+
+def medium(filename, kind, n, **kwargs):
+    """
+    Densities of the medium in filename, generated with GENERATORS[kind](n,
+    **kwargs) and written there if the file does not exist yet.  Returned as
+    a read-only array mapped from the file.
+    """
+    # Lists and tuples compare equal once written as JSON
+    params = json.loads(json.dumps({'kind': kind, 'n': n, 'kwargs': kwargs}))
+    info = filename + '.json'
+    if not os.path.exists(filename):
+        rho = GENERATORS[kind](n, **kwargs)
+        # Written under another name first: runs started at the same time
+        # all write the same medium and never read a partial file
+        tmp = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(params, f)
+        os.replace(tmp, info)
+        with open(tmp, 'wb') as f:
+            np.save(f, rho)
+        os.replace(tmp, filename)
+    try:
+        with open(info) as f:
+            saved = json.load(f)
+    except IOError:
+        raise ValueError('%s has no %s to check how it was generated'
+                         % (filename, info))
+    if saved != params:
+        raise ValueError('%s was generated with %s, not %s'
+                         % (filename, saved, params))
+    rho = np.load(filename, mmap_mode='r')
+    if rho.shape != (n,):
+        raise ValueError('%s has %d layers, not %d' % (filename, rho.size, n))
+    return rho
+
+def write_fortran(rho, filename='setprob.rho.bin'):
+    """
+    Write rho as raw doubles, as read by acoustics_1d_layered/layers_module.f90.
+    """
+    np.asarray(rho, dtype='<f8').tofile(filename)
+
+def set_aux(state, rho, c=1.0, width=1.0, x0=0.0):
+    """
+    Impedance rho c in aux[0] and sound speed c in aux[1] for the layers
+    rho; c is a number or one value per layer.
+    """
+    xc = state.grid.x.centers
+    layer = np.clip(np.floor((xc - x0)/width).astype(int), 0, len(rho) - 1)
+    c = np.asarray(c, dtype=float)
+    if c.ndim > 0:
+        c = c[layer]
+    state.aux[1, :] = c
+    state.aux[0, :] = np.asarray(rho)[layer]*c
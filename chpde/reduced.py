@@ -0,0 +1,180 @@
+r"""
+Reduced output computed during the run
+======================================
+
+Instead of (or besides) full frames, write only what is needed from the
+solution at each output time: a box, a subsample, 1D cuts or averages over
+circles.  Each reduction gets a name and is written to
+outdir/<name>.XXXX.npz:
+
+    from chpde import reduced
+    reduced.reduced_output(claw, frames=False,
+                           radial=reduced.RadialAverage((0.0, 0.0), nbins=100),
+                           axis=reduced.Cut(0, 0.0, components=[0]),
+                           corner=reduced.Box((0.0, 0.0), (0.5, 0.5)),
+                           coarse=reduced.Subsample(4))
+
+With frames=False no fort.* files are written.  The reductions are read
+back with load(), which stacks the frames:
+
+    data = reduced.load('radial', '_output')
+    plt.plot(data['r'], data['q'][-1, 0])    # last output time, q[0]
+
+    Box(lower, upper, stride)   cells with centers in [lower, upper], every
+                                stride'th cell in each direction
+    Subsample(stride)           every stride'th cell of the whole domain
+    Cut(axis, at)               cells along direction axis through the cells
+                                nearest to the point at (the coordinates in
+                                the other directions)
+    RadialAverage(center, nbins, rmax)
+                                average, min and max of q over rings of
+                                equal width around center (2D)
+
+All take components, the list of components of q to keep (default all).
+Reductions are computed from the state of a single process; they are not
+supported with PETSc.
+"""
+import glob
+import os
+import weakref
+import numpy as np
+
+# Reductions of each solution, kept outside of it so that the copies in
+# claw.frames do not copy them
+_reductions = weakref.WeakKeyDictionary()
+
+class Box(object):
+    def __init__(self, lower=None, upper=None, stride=1, components=None):
+        self.lower = lower
+        self.upper = upper
+        self.stride = stride
+        self.components = components
+
+    def __call__(self, state):
+        grid = state.grid
+        names = [d.name for d in grid.dimensions]
+        index = []
+        data = {}
+        for i, x in enumerate([d.centers for d in grid.dimensions]):
+            lower = -np.inf if self.lower is None else self.lower[i]
+            upper = np.inf if self.upper is None else self.upper[i]
+            cells = np.nonzero((x >= lower) & (x <= upper))[0]
+            if len(cells) == 0:
+                raise ValueError('Box has no cells in direction %s' % names[i])
+            index.append(slice(cells[0], cells[-1] + 1, self.stride))
+            data[names[i]] = x[index[-1]]
+        data['q'] = _components(state.q, self.components)[(slice(None),) + tuple(index)]
+        return data
+
+class Subsample(Box):
+    def __init__(self, stride, components=None):
+        Box.__init__(self, stride=stride, components=components)
+
+class Cut(object):
+    def __init__(self, axis, at, components=None):
+        self.axis = axis
+        self.at = np.atleast_1d(at)
+        self.components = components
+
+    def __call__(self, state):
+        grid = state.grid
+        dims = grid.dimensions
+        index = []
+        data = {}
+        others = iter(self.at)
+        for i, d in enumerate(dims):
+            if i == self.axis:
+                index.append(slice(None))
+                data[d.name] = d.centers
+            else:
+                x = next(others)
+                k = int(np.argmin(np.abs(d.centers - x)))
+                index.append(k)
+                # Position of the cells actually used
+                data[d.name] = d.centers[k]
+        data['q'] = _components(state.q, self.components)[(slice(None),) + tuple(index)]
+        return data
+
+class RadialAverage(object):
+    def __init__(self, center, nbins=100, rmax=None, components=None):
+        self.center = center
+        self.nbins = nbins
+        self.rmax = rmax
+        self.components = components
+        self._bins = None
+
+    def __call__(self, state):
+        X, Y = state.grid.p_centers
+        q = _components(state.q, self.components)
+        if self._bins is None or self._bins[0].size != X.size:
+            # The rings are the same at every output time
+            r = np.sqrt((X - self.center[0])**2 + (Y - self.center[1])**2)
+            rmax = self.rmax if self.rmax is not None else r.max()
+            # r == rmax goes in the last ring, cells beyond rmax in none
+            k = np.where(r <= rmax, np.minimum((r/rmax*self.nbins).astype(int),
+                                               self.nbins - 1), self.nbins)
+            count = np.bincount(k.ravel(), minlength=self.nbins+1)[:self.nbins]
+            self._bins = (k.ravel(), count, rmax)
+        flat, count, rmax = self._bins
+        m = q.shape[0]
+        mean = np.zeros((m, self.nbins))
+        qmin = np.full((m, self.nbins), np.inf)
+        qmax = np.full((m, self.nbins), -np.inf)
+        inside = flat < self.nbins
+        for c in range(m):
+            values = q[c].ravel()[inside]
+            mean[c] = np.bincount(flat[inside], values, self.nbins)
+            np.minimum.at(qmin[c], flat[inside], values)
+            np.maximum.at(qmax[c], flat[inside], values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean /= count
+        dr = rmax/self.nbins
+        return {'r': (np.arange(self.nbins) + 0.5)*dr, 'count': count,
+                'q': mean, 'qmin': qmin, 'qmax': qmax}
+
+def _components(q, components):
+    return q if components is None else q[list(components)]
+
+def _file(path, name, frame):
+    return os.path.join(path, '%s.%s.npz' % (name, str(frame).zfill(4)))
+
+def write_reductions(solution, frame, path):
+    os.makedirs(path, exist_ok=True)
+    state = solution.states[0]
+    for name, reduction in _reductions[solution].items():
+        data = reduction(state)
+        np.savez(_file(path, name, frame), t=solution.t, **data)
+
+def reduced_output(claw, frames=True, **reductions):
+    """
+    Make the Controller claw write the given reductions (name=reduction) at
+    each output time, and full frames only if frames is True.
+    """
+    from chpde.frames import _install
+    _install(claw.solution)
+    _reductions[claw.solution] = dict(reductions)
+    if not frames:
+        claw.output_format = 'reduced'
+
+def load(name, path='_output'):
+    """
+    Read the output of reduction name.  Returns a dict with t, the output
+    times, and the arrays computed at each time (q, ...) stacked along a
+    new first axis; the coordinates are those of the first frame.
+    """
+    files = sorted(glob.glob(os.path.join(path, '%s.[0-9]*.npz' % name)))
+    if not files:
+        raise IOError('No output of %s in %s' % (name, path))
+    frames = []
+    for f in files:
+        with np.load(f) as z:
+            frames.append({key: z[key] for key in z.files})
+    data = {'t': np.array([float(f['t']) for f in frames])}
+    for key in frames[0]:
+        if key == 't':
+            continue
+        if key in ('q', 'qmin', 'qmax'):
+            data[key] = np.array([f[key] for f in frames])
+        else:
+            data[key] = frames[0][key]
+    return data
@@ -0,0 +1,165 @@
+r"""
+Plots of all frames with a pool of processes
+============================================
+
+Make the same png and html files as VisClaw's plotclaw for a setplot
+function, with the frames divided among processes:
+
+    python -m chpde.render euler_2d/shock_bubble_interaction.py \
+        --outdir euler_2d/_output --plotdir euler_2d/_plots --jobs 8
+
+or from python, e.g. after claw.run() in a driver:
+
+    from chpde import render
+    render.render(setplot, claw.outdir, '_plots')
+
+setplot is a function, or a python file defining setplot (a driver or a
+setplot.py).  VisClaw's own parallel plotting starts one python process per
+group of frames, which imports everything and calls setplot again, and only
+works when setplot is given as a module name.  Here each process of the pool
+calls setplot once and then draws any number of frames; frames are handed
+out one at a time, so slow frames do not hold up the others.  Each process
+keeps its matplotlib figures from one frame to the next instead of creating
+them again.  The index, html and latex pages, the gauge plots and the
+movies are made at the end in the calling process, as plotclaw does.
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import inspect
+import multiprocessing
+import os
+import time
+
+def _setplot_function(setplot):
+    """
+    The setplot function, given directly or by a python file defining it.
+    """
+    if callable(setplot):
+        return setplot
+    from chpde.benchmark import load_driver
+    return load_driver(os.path.abspath(setplot)).setplot
+
+def _setplot_source(setplot):
+    # What to pass to the workers: the file defining the function
+    if callable(setplot):
+        return os.path.abspath(inspect.getsourcefile(setplot))
+    return os.path.abspath(setplot)
+
+def _plotdata(setplot, outdir, plotdir, format):
+    from clawpack.visclaw.data import ClawPlotData
+    from clawpack.visclaw import frametools
+    plotdata = ClawPlotData(file_format=format)
+    plotdata.outdir = os.path.abspath(outdir)
+    plotdata.plotdir = os.path.abspath(plotdir)
+    plotdata.format = format
+    plotdata.setplot = _setplot_function(setplot)
+    return frametools.call_setplot(plotdata.setplot, plotdata)
+
+@contextlib.contextmanager
+def _keep_cwd():
+    # plotclaw_driver changes the working directory
+    cwd = os.getcwd()
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+#------------------------------------------------------------------------------
+# Workers
+#------------------------------------------------------------------------------
+_worker = {}
+
+def _init_worker(setplot, outdir, plotdir, format):
+    import warnings
+    import matplotlib
+    matplotlib.use('Agg')
+    # plotframe passes the figure size again for an existing figure
+    warnings.filterwarnings('ignore', 'Ignoring specified arguments in this call')
+    from clawpack.visclaw import frametools
+    plotdata = _plotdata(setplot, outdir, plotdir, format)
+    plotdata.parallel = True
+    plotdata.num_procs = 2
+    plotdata._parallel_todo = 'frames'
+    # Figures are cleared, not closed, after they are saved, so that the
+    # next frame draws into the same figures.  Figures that are not cleared
+    # at each frame must be closed to look the same as with plotclaw.
+    figures = plotdata.plotfigure_dict.values()
+    if all(f.clf_each_frame for f in figures) and not plotdata.kml:
+        printfig = frametools.printfig
+        def keep_figure(*args, **kwargs):
+            kwargs['close_fig'] = False
+            return printfig(*args, **kwargs)
+        frametools.printfig = keep_figure
+    _worker['plotdata'] = plotdata
+
+def _render_frame(frameno):
+    from clawpack.visclaw import plotpages
+    plotdata = _worker['plotdata']
+    plotdata.print_framenos = [frameno]
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as f, contextlib.redirect_stdout(f), _keep_cwd():
+        plotpages.plotclaw_driver(plotdata, verbose=False, format=plotdata.format)
+    return frameno, time.perf_counter() - start
+
+#------------------------------------------------------------------------------
+def render(setplot, outdir='_output', plotdir='_plots', format='ascii',
+           frames=None, jobs=None, verbose=True):
+    """
+    Make the plots of setplot for the frames in outdir (default: all) in
+    plotdir, with jobs processes (default: number of cores).
+    """
+    from clawpack.visclaw import frametools, plotpages
+    os.environ['MPLBACKEND'] = 'Agg'
+    plotdata = _plotdata(setplot, outdir, plotdir, format)
+    if frames is None:
+        frames = frametools.only_most_recent(plotdata.print_framenos,
+                                             plotdata.outdir)
+    frames = list(frames)
+    jobs = min(jobs or os.cpu_count(), max(len(frames), 1))
+    plotdata.parallel = True
+    plotdata.num_procs = max(jobs, 2)
+    plotdata.print_framenos = frames
+
+    start = time.perf_counter()
+    with _keep_cwd():
+        # Clears plotdir, as plotclaw does
+        plotdata._parallel_todo = 'initialize'
+        plotpages.plotclaw_driver(plotdata, verbose=False, format=format)
+
+    # The repository root must be importable in the workers
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in os.environ.get('PYTHONPATH', '').split(os.pathsep):
+        os.environ['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [root, os.environ.get('PYTHONPATH')]))
+    context = multiprocessing.get_context('spawn')
+    args = (_setplot_source(setplot), plotdata.outdir, plotdata.plotdir, format)
+    with concurrent.futures.ProcessPoolExecutor(jobs, mp_context=context,
+                                                initializer=_init_worker,
+                                                initargs=args) as pool:
+        for frameno, seconds in pool.map(_render_frame, frames):
+            if verbose:
+                print('Frame %i plotted in %.2f s' % (frameno, seconds))
+
+    with _keep_cwd():
+        # Index, html and latex pages, gauges and movies
+        plotdata._parallel_todo = 'finalize'
+        plotpages.plotclaw_driver(plotdata, verbose=False, format=format)
+    if verbose:
+        print('%d frames plotted in %.2f s with %d processes'
+              % (len(frames), time.perf_counter() - start, jobs))
+    return plotdata
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plot the frames of a run in parallel')
+    parser.add_argument('setplot', help='Python file defining setplot()')
+    parser.add_argument('--outdir', default='_output', help='Directory of the frames')
+    parser.add_argument('--plotdir', default='_plots', help='Directory for the plots')
+    parser.add_argument('--format', default='ascii', help='Format of the frames')
+    parser.add_argument('--frames', type=int, nargs='+', help='Frames to plot (default: all)')
+    parser.add_argument('--jobs', type=int, help='Number of processes (default: cores)')
+    args = parser.parse_args(argv)
+    render(args.setplot, args.outdir, args.plotdir, args.format, args.frames, args.jobs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+r"""
+Point and line sources in 1D
+============================
+
+Sources at fixed places, like the on-ramp of book/chap17/onramp, for any
+number of them:
+
+    ramps = sources.Sources()
+    ramps.add(0.0, 0.008)                        # point source at x = 0
+    ramps.add((2.0, 2.5), (times, rates))        # line source, rate table
+    ramps.add(4.0, lambda t: -0.002*(t > 5.0))   # off-ramp opening at t = 5
+    solver.step_source = ramps                   # or solver.dq_src = ramps.dq
+
+    where   x for a point source, in the cell with x_{i-1/2} <= x < x_{i+1/2}
+            as in onramp/src1.f, or (xl, xr) for a line source spread
+            over the cells it overlaps in proportion to the overlap
+    rate    amount of q per unit time: a number, a function of t, or a
+            table (times, rates) interpolated linearly, constant outside
+
+The cell index and weight of every source are computed once, at the first
+step and again only if the grid changes, so a step is one evaluation of
+the rates and one scatter-add of all sources into q.  Rates given by
+tables with the same times are interpolated together.  Rates are taken at
+the middle of the time interval of each call: t + dt/2 for a step of
+length dt (source_split = 1 or dq_src), and t + dt/4 and t + 3 dt/4 for
+the two half steps of source_split = 2, which are both called with the
+state.t of the start of the step.
+"""
+import numpy as np
+
+class Sources(object):
+    def __init__(self, component=0):
+        self.component = component
+        self.places = []
+        self.rates = []
+        self._grid = self._tables = None
+        self._half = None
+
+    def add(self, where, rate):
+        """
+        Add a source at where with rate, see above.
+        """
+        self.places.append(where)
+        self.rates.append(rate)
+        self._grid = self._tables = None
+
+    def _index(self, lower, dx, mx):
+        # Cell, weight (per unit length) and source of each term
+        cells, weights, owners = [], [], []
+        upper = lower + mx*dx
+        for k, where in enumerate(self.places):
+            if np.ndim(where) == 0:
+                if not lower <= where < upper:
+                    raise ValueError('Source at %g is outside [%g, %g)' % (where, lower, upper))
+                cells.append(int(min((where - lower)//dx, mx - 1)))
+                weights.append(1.0/dx)
+                owners.append(k)
+            else:
+                xl, xr = where
+                if not lower <= xl < xr <= upper:
+                    raise ValueError('Source on [%g, %g] is outside [%g, %g]'
+                                     % (xl, xr, lower, upper))
+                i = np.arange(int((xl - lower)//dx), min(int(np.ceil((xr - lower)/dx)), mx))
+                overlap = (np.minimum(lower + (i + 1)*dx, xr)
+                           - np.maximum(lower + i*dx, xl))
+                keep = overlap > 0.0
+                cells.extend(i[keep])
+                weights.extend(overlap[keep]/((xr - xl)*dx))
+                owners.extend([k]*int(keep.sum()))
+        self.cells = np.array(cells, dtype=int)
+        self.weights = np.array(weights)
+        self.owners = np.array(owners, dtype=int)
+
+    def _group_rates(self):
+        # Constants, functions, and tables grouped by their times
+        self._constant = np.zeros(len(self.rates))
+        self._functions = []
+        tables = {}
+        for k, rate in enumerate(self.rates):
+            if callable(rate):
+                self._functions.append((k, rate))
+            elif np.ndim(rate) == 0:
+                self._constant[k] = rate
+            else:
+                times, values = rate
+                times = tuple(np.asarray(times, dtype=float))
+                tables.setdefault(times, []).append((k, values))
+        self._tables = [(np.array(times), np.array([k for k, v in group]),
+                         np.array([v for k, v in group], dtype=float))
+                        for times, group in tables.items()]
+
+    def rate(self, t):
+        """
+        Array of the rates of all sources at time t.
+        """
+        if self._tables is None:
+            self._group_rates()
+        r = self._constant.copy()
+        for k, f in self._functions:
+            r[k] = f(t)
+        for times, ks, values in self._tables:
+            if len(times) == 1:
+                r[ks] = values[:, 0]
+                continue
+            i = np.clip(np.searchsorted(times, t), 1, len(times) - 1)
+            w = np.clip((t - times[i-1])/(times[i] - times[i-1]), 0.0, 1.0)
+            r[ks] = (1.0 - w)*values[:, i-1] + w*values[:, i]
+        return r
+
+    def _setup(self, state):
+        x = state.grid.dimensions[0]
+        grid = (x.lower, x.delta, x.num_cells)
+        if grid != self._grid:
+            self._index(*grid)
+            self._grid = grid
+
+    def dq(self, solver, state, dt):
+        """
+        Change of q in a step of length dt, as SharpClaw's dq_src.
+        """
+        self._setup(state)
+        dq = np.zeros(state.q.shape)
+        r = self.rate(state.t + 0.5*dt)
+        np.add.at(dq[self.component], self.cells, dt*self.weights*r[self.owners])
+        return dq
+
+    def _time(self, solver, state, dt):
+        # The second half step of Strang splitting is the second call with
+        # the same state.t and dt
+        t = state.t + 0.5*dt
+        if getattr(solver, 'source_split', 1) == 2:
+            if self._half == (state.t, dt):
+                self._half = None
+                return t + dt
+            self._half = (state.t, dt)
+        return t
+
+    def __call__(self, solver, state, dt):
+        self._setup(state)
+        r = self.rate(self._time(solver, state, dt))
+        np.add.at(state.q[self.component], self.cells, dt*self.weights*r[self.owners])
@@ -0,0 +1,130 @@
+r"""
+Implicit steps for stiff source terms
+=====================================
+
+Steps for q_t = psi(q) with a stiff scalar psi, solving the implicit
+equations of all cells at once, to use as the source term of a fractional
+step method:
+
+    def psi(q):
+        return q*(1.0 - q)*(q - beta)/tau
+
+    def dpsi(q):
+        return (-3.0*q**2 + 2.0*(1.0 + beta)*q - beta)/tau
+
+    solver.step_source = stiff.StiffSource(psi, dpsi, method='trbdf2')
+
+    method  'rk2'           2-stage explicit Runge-Kutta
+            'trapezoidal'   q = qn + dt/2 (psi(qn) + psi(q))
+            'trbdf2'        trapezoidal half step to q*, then the BDF2 step
+                            3 q - 4 q* + qn = dt psi(q)
+
+as iode = 1, 2, 3 in book/chap17/stiffburgers/src1.f.  The implicit
+equations are solved by newton(), a Newton iteration on the array of all
+cells with the analytic derivative dpsi.  Cells that have converged are
+left out of the next iterations.  Each cell keeps an interval where its
+equation changes sign, starting with bracket (like the interval of zeroin
+in src1.f); a Newton step that leaves the interval is replaced by
+bisection, so cells where Newton alone would jump out of the interval
+still converge.
+
+The iteration starts from q^n, so when the implicit equation has several
+roots (dt much larger than the time scale of psi) it finds the root next
+to q^n.  zeroin searches the whole interval instead; for the bistable psi
+of stiffburgers the two agree for q^n in [0, 1], while for a small overshoot
+like q^n = -0.02 zeroin returns the root near 1.
+"""
+import numpy as np
+
+def newton(f, df, x, lower, upper, args=(), tol=1e-12, maxiter=100):
+    """
+    Solve f(x, *args) = 0 elementwise, starting from the array x, where
+    args are arrays of the shape of x.  lower and upper are scalars or
+    arrays bounding the roots; if f has the same sign at both, only Newton
+    steps are taken in that cell.  Returns the array of roots.
+    """
+    x = np.array(x, dtype=float)
+    shape = x.shape
+    x = x.ravel()
+    args = [np.broadcast_to(a, shape).ravel() for a in args]
+    lo = np.broadcast_to(np.asarray(lower, dtype=float), shape).ravel().copy()
+    hi = np.broadcast_to(np.asarray(upper, dtype=float), shape).ravel().copy()
+
+    # lo where f < 0 and hi where f > 0
+    flo, fhi = f(lo, *args), f(hi, *args)
+    swap = flo > 0.0
+    lo[swap], hi[swap] = hi[swap], lo[swap]
+    bracketed = flo*fhi <= 0.0
+    x = np.where(bracketed & ((x - lo)*(x - hi) > 0.0), 0.5*(lo + hi), x)
+
+    active = np.arange(x.size)
+    for it in range(maxiter):
+        xa = x[active]
+        a = [v[active] for v in args]
+        fx = f(xa, *a)
+        dfx = df(xa, *a)
+        neg = fx < 0.0
+        la, ha = lo[active], hi[active]
+        la[neg] = xa[neg]
+        ha[~neg] = xa[~neg]
+        lo[active], hi[active] = la, ha
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xn = xa - fx/dfx
+        # Bisection where the Newton step leaves the interval
+        bad = ~np.isfinite(xn) | (bracketed[active] & ((xn - la)*(xn - ha) > 0.0))
+        xn[bad] = 0.5*(la[bad] + ha[bad])
+        x[active] = xn
+
+        done = (fx == 0.0) | (np.abs(xn - xa) <= tol*(1.0 + np.abs(xn)))
+        active = active[~done]
+        if active.size == 0:
+            return x.reshape(shape)
+    raise RuntimeError('Newton iteration did not converge in %d of %d cells'
+                       % (active.size, x.size))
+
+class StiffSource(object):
+    def __init__(self, psi, dpsi, method='trbdf2', component=0,
+                 bracket=(-1.0, 2.0), tol=1e-12, maxiter=100):
+        if method not in ('rk2', 'trapezoidal', 'trbdf2'):
+            raise ValueError('Unknown method %s' % method)
+        self.psi = psi
+        self.dpsi = dpsi
+        self.method = method
+        self.component = component
+        self.bracket = bracket
+        self.tol = tol
+        self.maxiter = maxiter
+
+    def _solve(self, f, df, x, args):
+        return newton(f, df, x, self.bracket[0], self.bracket[1], args,
+                      self.tol, self.maxiter)
+
+    def step(self, q, dt):
+        """
+        Return q after one step of length dt of q_t = psi(q).
+        """
+        psi, dpsi = self.psi, self.dpsi
+        if self.method == 'rk2':
+            qstar = q + 0.5*dt*psi(q)
+            return q + dt*psi(qstar)
+
+        # Trapezoidal step of length h
+        def g(x, qn, psin, h):
+            return x - qn - 0.5*h*(psin + psi(x))
+        def dg(x, qn, psin, h):
+            return 1.0 - 0.5*h*dpsi(x)
+
+        if self.method == 'trapezoidal':
+            return self._solve(g, dg, q, (q, psi(q), dt))
+
+        qstar = self._solve(g, dg, q, (q, psi(q), 0.5*dt))
+        def gbdf2(x, qn, qstar):
+            return 3.0*x - 4.0*qstar + qn - dt*psi(x)
+        def dgbdf2(x, qn, qstar):
+            return 3.0 - dt*dpsi(x)
+        return self._solve(gbdf2, dgbdf2, qstar, (q, qstar))
+
+    def __call__(self, solver, state, dt):
+        m = self.component
+        state.q[m] = self.step(state.q[m], dt)
@@ -0,0 +1,212 @@
+r"""
+Parameter sweeps over setup() arguments
+=======================================
+
+Run an example for every combination of values of some setup() arguments,
+in parallel with one process per core, and collect summary quantities of
+each run in one table:
+
+    python -m chpde.sweep acoustics_1d_variable/acoustics_1d.py \
+        --param ic=0,1 --param medium=0,1 --dir sweep_acoustics
+
+    python -m chpde.sweep euler_1d/woodward_colella_blast.py \
+        --param solver_type=classic,sharpclaw --param order=1,2 --jobs 4
+
+Each run writes its output to its own directory below --dir.  Results are
+appended to results.jsonl there as soon as a run finishes, and runs already
+in that file are skipped, so an interrupted sweep continues where it
+stopped when started again.  At the end all results are written to
+results.csv.
+
+The summary of a run has the final time, the number of steps, the wall
+time, the L1, L2 and max norms of each component of q, and q at the gauges.
+A driver can add its own quantities with a function sweep_summary(claw)
+returning a dict.
+
+Each worker limits BLAS/OpenMP to one thread, since the runs already use
+all cores.  The sweep can also be used from python:
+
+    from chpde import sweep
+    rows = sweep.sweep('shallow_1d/dam_break.py', {'ic': ['dam-break', '2-shock']})
+"""
+import argparse
+import ast
+import concurrent.futures
+import csv
+import hashlib
+import inspect
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+               'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+def parameter_grid(params):
+    """
+    List of dicts with all combinations of params, a dict of lists.
+    """
+    names = list(params)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(params[n] for n in names))]
+
+def run_name(path, params):
+    text = json.dumps([os.path.basename(path), params], sort_keys=True)
+    return 'run_' + hashlib.sha1(text.encode()).hexdigest()[:12]
+
+def default_summary(claw):
+    import numpy as np
+    state = claw.solution.state
+    grid = state.grid
+    q = state.q.reshape(state.num_eqn, -1)
+    dv = np.prod(grid.delta)
+    summary = {'t': claw.solution.t,
+               'num_steps': claw.solver.status['numsteps']}
+    for m in range(state.num_eqn):
+        summary['q%d_L1' % m] = float(np.sum(np.abs(q[m]))*dv)
+        summary['q%d_L2' % m] = float(np.sqrt(np.sum(q[m]**2)*dv))
+        summary['q%d_max' % m] = float(np.max(np.abs(q[m])))
+    for k, gauge in enumerate(grid.gauges):
+        for m in range(state.num_eqn):
+            summary['gauge%d_q%d' % (k, m)] = float(state.q[(m,) + tuple(gauge)])
+    return summary
+
+def run_one(path, params, outdir, output=True, tfinal=None):
+    """
+    Run the example at path with setup(**params) and return its summary.
+    """
+    from chpde.benchmark import load_driver
+
+    os.chdir(os.path.dirname(path))
+    module = load_driver(path)
+    kwargs = dict(params)
+    kwargs['outdir'] = outdir
+    if not output:
+        kwargs['disable_output'] = True
+    accepted = inspect.signature(module.setup).parameters
+    kwargs = {k: v for k, v in kwargs.items() if k in accepted}
+    unknown = set(params) - set(accepted)
+    if unknown:
+        raise TypeError('setup() does not take %s' % ', '.join(sorted(unknown)))
+
+    claw = module.setup(**kwargs)
+    claw.outdir = outdir
+    claw.keep_copy = False
+    claw.verbosity = 0
+    if not output:
+        claw.output_format = None
+    if tfinal is not None:
+        claw.tfinal = tfinal
+    t0 = time.perf_counter()
+    claw.run()
+    summary = {'wall_time': time.perf_counter() - t0}
+    summary.update(default_summary(claw))
+    if hasattr(module, 'sweep_summary'):
+        summary.update(module.sweep_summary(claw))
+    return summary
+
+def _read_results(filename):
+    results = {}
+    if os.path.exists(filename):
+        with open(filename) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    results[row['run']] = row
+    return results
+
+def write_table(filename, rows):
+    fields = []
+    for row in rows:
+        fields += [k for k in row if k not in fields]
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def sweep(path, params, directory='_sweep', jobs=None, output=True, tfinal=None):
+    """
+    Run the example at path for all combinations of params (a dict of lists
+    of setup() arguments) and return the list of result rows, one per run.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.abspath(directory)
+    os.makedirs(directory, exist_ok=True)
+    results_file = os.path.join(directory, 'results.jsonl')
+    done = _read_results(results_file)
+
+    runs = [(run_name(path, p), p) for p in parameter_grid(params)]
+    # Failed runs are tried again
+    todo = [(name, p) for name, p in runs
+            if done.get(name, {}).get('status') != 'ok']
+    print('%d runs, %d done before, %d to do' % (len(runs), len(runs)-len(todo), len(todo)))
+
+    # The repository root must be importable in the workers, and the thread
+    # limits must be in their environment when they start: spawned workers
+    # import __main__, and possibly numpy, before any initializer runs
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in os.environ.get('PYTHONPATH', '').split(os.pathsep):
+        os.environ['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [root, os.environ.get('PYTHONPATH')]))
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    for var in THREAD_VARS:
+        os.environ[var] = '1'
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(jobs or os.cpu_count(),
+                                                mp_context=context) as pool:
+        futures = {pool.submit(run_one, path, p, os.path.join(directory, name),
+                               output, tfinal): (name, p) for name, p in todo}
+        with open(results_file, 'a') as f:
+            for future in concurrent.futures.as_completed(futures):
+                name, p = futures[future]
+                row = {'run': name}
+                row.update(p)
+                try:
+                    row.update(future.result())
+                    row['status'] = 'ok'
+                except Exception as e:
+                    row['status'] = 'error'
+                    row['error'] = '%s: %s' % (type(e).__name__, e)
+                done[name] = row
+                f.write(json.dumps(row) + '\n')
+                f.flush()
+                print('%s %s %s' % (name, p, row['status']))
+
+    rows = [done[name] for name, p in runs]
+    write_table(os.path.join(directory, 'results.csv'), rows)
+    return rows
+
+def _parse_param(text):
+    name, values = text.split('=', 1)
+    parsed = []
+    for value in values.split(','):
+        try:
+            parsed.append(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            parsed.append(value)
+    return name, parsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parameter sweep of a PyClaw example')
+    parser.add_argument('driver', help='Python file defining setup()')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=V1,V2,..',
+                        help='Values of a setup() argument, may be repeated')
+    parser.add_argument('--dir', default='_sweep', help='Directory for output and results')
+    parser.add_argument('--jobs', type=int, help='Number of processes (default: cores)')
+    parser.add_argument('--no-output', action='store_true', help='Do not write frames')
+    parser.add_argument('--tfinal', type=float, help='Override the final time')
+    args = parser.parse_args(argv)
+
+    params = dict(_parse_param(p) for p in args.param)
+    rows = sweep(args.driver, params, args.dir, args.jobs, not args.no_output,
+                 args.tfinal)
+    failed = [row for row in rows if row['status'] != 'ok']
+    for row in failed:
+        print('%s failed: %s' % (row['run'], row['error']))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
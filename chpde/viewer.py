@@ -0,0 +1,143 @@
+r"""
+Plots of frames updated in place
+================================
+
+Stepping through frames by clearing the axes and plotting again spends
+most of the time creating artists.  These views create their artists for
+the first frame and only change their data for the next ones:
+
+    fig, ax = plt.subplots()
+    view = viewer.Pcolor(ax, 0, clim=(0.0, 2.0), title='Depth, t = {t:.3f}')
+    for frame, sol in frames.FrameReader('_output'):
+        view(sol)
+        plt.pause(0.01)
+
+    Pcolor(ax, m)    pcolormesh of q[m], the colors are set with set_array
+    Surface(ax, m)   shaded surface of q[m] on 3d axes, the polygons are
+                     moved with set_verts and shaded again
+    Contour(ax, m)   contour lines of q[m]; matplotlib cannot change the
+                     data of contours, so only the lines are drawn again,
+                     not the axes
+
+A view is called with a pyclaw.Solution, so it can be used as the
+plot_frame function of VisClaw's Iplot.  The cell centers are computed for
+the first frame and kept while the frames have the same grid.  ax=None
+uses the current axes at the first frame.
+"""
+import numpy as np
+
+class _View(object):
+    def __init__(self, ax, m, title):
+        self.ax = ax
+        self.m = m
+        self.title = title
+        self._shape = None
+
+    def _grid(self, frame):
+        # Coordinates of the first frame, computed again if the grid changes
+        grid = frame.state.grid
+        if self._shape != tuple(grid.num_cells):
+            self._shape = tuple(grid.num_cells)
+            self.centers = grid.p_centers
+            self.nodes = grid.p_nodes
+            return True
+        return False
+
+    def __call__(self, frame):
+        import matplotlib.pyplot as plt
+        if self.ax is None:
+            self.ax = plt.gca()
+        new_grid = self._grid(frame)
+        self.update(frame.state.q[self.m], new_grid)
+        if self.title is not None:
+            self.ax.set_title(self.title.format(t=frame.t))
+        self.ax.figure.canvas.draw_idle()
+
+class Pcolor(_View):
+    def __init__(self, ax=None, m=0, cmap='viridis', clim=None, colorbar=False,
+                 title=None):
+        _View.__init__(self, ax, m, title)
+        self.cmap = cmap
+        self.clim = clim
+        self.colorbar = colorbar
+        self.mesh = None
+
+    def update(self, q, new_grid):
+        if self.mesh is None or new_grid:
+            if self.mesh is not None:
+                self.mesh.remove()
+            x, y = self.nodes
+            self.mesh = self.ax.pcolormesh(x, y, q, cmap=self.cmap, shading='flat')
+            self.ax.set_aspect('equal')
+            if self.colorbar:
+                self.ax.figure.colorbar(self.mesh, ax=self.ax)
+                self.colorbar = False
+        else:
+            self.mesh.set_array(q.ravel())
+        if self.clim is not None:
+            self.mesh.set_clim(*self.clim)
+        else:
+            self.mesh.set_clim(q.min(), q.max())
+
+class Surface(_View):
+    def __init__(self, ax=None, m=0, color='silver', rcount=50, ccount=50,
+                 title=None):
+        _View.__init__(self, ax, m, title)
+        self.color = color
+        self.rcount = rcount
+        self.ccount = ccount
+        self.surf = None
+
+    def _polygons(self, z):
+        # One quadrilateral per cell of the strided grid, as plot_surface
+        x, y = self.x, self.y
+        corners = [(slice(None, -1), slice(None, -1)), (slice(None, -1), slice(1, None)),
+                   (slice(1, None), slice(1, None)), (slice(1, None), slice(None, -1))]
+        return np.stack([np.stack([a[c].ravel() for c in corners], axis=-1)
+                         for a in (x, y, z)], axis=-1)
+
+    def _shade(self, polys):
+        # Same shading as plot_surface with its default light source
+        from matplotlib import colors
+        normals = np.cross(polys[:, 0] - polys[:, 1], polys[:, 1] - polys[:, 2])
+        light = colors.LightSource(azdeg=225, altdeg=19.4712)
+        with np.errstate(invalid='ignore'):
+            shade = (normals/np.linalg.norm(normals, axis=1, keepdims=True)) @ light.direction
+        shade[np.isnan(shade)] = 0.0
+        rgba = np.tile(colors.to_rgba(self.color), (len(polys), 1))
+        rgba[:, :3] *= 0.3 + 0.7*(shade[:, None] + 1.0)/2.0
+        return rgba
+
+    def update(self, q, new_grid):
+        if new_grid:
+            x, y = self.centers
+            self.stride = (max(int(np.ceil(x.shape[0]/self.rcount)), 1),
+                           max(int(np.ceil(x.shape[1]/self.ccount)), 1))
+            # Every stride-th row and column, and always the last one
+            self.index = np.ix_(*[np.unique(np.r_[0:n:s, n-1])
+                                  for n, s in zip(x.shape, self.stride)])
+            self.x, self.y = x[self.index], y[self.index]
+        z = q[self.index]
+        polys = self._polygons(z)
+        if self.surf is None or new_grid:
+            if self.surf is not None:
+                self.surf.remove()
+            self.surf = self.ax.plot_surface(self.x, self.y, z, color=self.color,
+                                             shade=True, linewidths=1,
+                                             rstride=1, cstride=1)
+        else:
+            self.surf.set_verts(polys)
+        self.surf.set_facecolor(self._shade(polys))
+
+class Contour(_View):
+    def __init__(self, ax=None, m=0, levels=None, title=None, **kwargs):
+        _View.__init__(self, ax, m, title)
+        self.levels = levels
+        self.kwargs = kwargs
+        self.contours = None
+
+    def update(self, q, new_grid):
+        if self.contours is not None:
+            self.contours.remove()
+        x, y = self.centers
+        self.contours = self.ax.contour(x, y, q, levels=self.levels, **self.kwargs)
@@ -24,29 +24,37 @@ from clawpack import pyclaw
 from clawpack import riemann
 from clawpack.riemann.euler_4wave_2D_constants import density, x_momentum, \
         y_momentum, energy, num_eqn
+from chpde import frames, viewer
 
-def load_frame(frame_number):
+def load_frame(catalog, frame_number):
     from clawpack.pyclaw import Solution
 
-    try:
-        return Solution(frame_number)
-    except:
+    if frame_number not in catalog:
         print("Reached end of frames")
         exit()
+    return Solution(frame_number)
 
-def plot_frame(frame):
+def plot_frame(view, frame):
     import matplotlib.pyplot as plt
-    q = frame.q
-    x, y = frame.state.grid.c_centers
-    plt.cla()
-    #plt.pcolormesh(x, y, q[density,...], cmap='viridis')
-    plt.contour(x, y, q[density,...], levels=20)
+    view(frame)
     plt.title('Density, t=' + str(frame.t))
-    plt.axis('equal')
 
-def plot_results():
+def plot_results(path='_output'):
+    import numpy as np
+    import matplotlib.pyplot as plt
     from clawpack.visclaw import iplot
-    ip = iplot.Iplot(load_frame,plot_frame)
+    catalog = frames.Catalog(path)
+    # Same contour levels for all frames; the view is made on the axes of
+    # the first plot, and only its lines are drawn again for the next frames
+    levels = np.linspace(*catalog.limits(density), 21)
+    views = []
+    def plot(frame):
+        if not views:
+            #views.append(viewer.Pcolor(plt.gca(), density, cmap='viridis'))
+            views.append(viewer.Contour(plt.gca(), density, levels=levels))
+            plt.axis('equal')
+        plot_frame(views[0], frame)
+    ip = iplot.Iplot(lambda frame_number: load_frame(catalog, frame_number), plot)
     ip.plotloop()
 
 solver = pyclaw.ClawSolver2D(riemann.euler_4wave_2D)
@@ -73,6 +81,7 @@ claw = pyclaw.Controller()
 claw.tfinal = 0.3
 claw.solution = solution
 claw.solver = solver
+frames.catalog_output(claw)
 
 status = claw.run()
 
@@ -20,6 +20,7 @@ from clawpack import riemann
 from clawpack.riemann.euler_4wave_2D_constants import density, x_momentum, \
         y_momentum, energy, num_eqn
 from clawpack.visclaw import colormaps
+from chpde import frames
 
 def setplot(plotdata):
     r"""Plotting settings
@@ -117,7 +118,11 @@ def setup(use_petsc=False,riemann_solver='roe'):
     claw.solution = solution
     claw.solver = solver
 
-    claw.output_format = 'ascii'    
+    if use_petsc:
+        claw.output_format = 'ascii'
+    else:
+        # Binary frames are much faster to write and to read than ascii
+        frames.binary_output(claw)
     claw.outdir = "./_output"
     claw.setplot = setplot
 
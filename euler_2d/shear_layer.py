@@ -9,6 +9,7 @@ from clawpack import riemann
 from clawpack.riemann.euler_4wave_2D_constants import density, x_momentum, \
         y_momentum, energy, num_eqn
 from clawpack.visclaw import colormaps
+from chpde import checkpoint, frames
 import numpy as np
 
 def setplot(plotdata):
@@ -42,7 +43,8 @@ def eta(y):
             + (y > 7/32)*(y < 9/32)*X2                 \
             + 0.0
 
-def setup(use_petsc=False,riemann_solver='roe'):
+def setup(use_petsc=False,riemann_solver='roe',checkpoint_every=None,
+          restart_from=None):
     if use_petsc:
         import clawpack.petclaw as pyclaw
     else:
@@ -65,20 +67,21 @@ def setup(use_petsc=False,riemann_solver='roe'):
     gamma = 1.4
     solution.problem_data['gamma']  = gamma
 
-    # Set initial data
     # Initial level of mach number
     M0 = 0.1
 
-    x, y = domain.grid.p_centers
-    rho  = gamma + 1.0e-3 * (1.0 - 2.0 * eta(y))
-    u    = M0 * (1.0 - 2.0 * eta(y))
-    v    = 0.1 * M0 * np.sin(2.0 * np.pi * x)
-    p    = np.ones_like(rho)
+    # Set initial data, unless it is taken from a checkpoint
+    if restart_from is None:
+        x, y = domain.grid.p_centers
+        rho  = gamma + 1.0e-3 * (1.0 - 2.0 * eta(y))
+        u    = M0 * (1.0 - 2.0 * eta(y))
+        v    = 0.1 * M0 * np.sin(2.0 * np.pi * x)
+        p    = np.ones_like(rho)
 
-    solution.q[density,...] = rho
-    solution.q[x_momentum,...] = rho * u
-    solution.q[y_momentum,...] = rho * v
-    solution.q[energy,...] = 0.5 * rho * (u**2 + v**2) + p / (gamma - 1.0)
+        solution.q[density,...] = rho
+        solution.q[x_momentum,...] = rho * u
+        solution.q[y_momentum,...] = rho * v
+        solution.q[energy,...] = 0.5 * rho * (u**2 + v**2) + p / (gamma - 1.0)
 
     claw = pyclaw.Controller()
     claw.tfinal = 0.8 / M0
@@ -86,9 +89,17 @@ def setup(use_petsc=False,riemann_solver='roe'):
     claw.solution = solution
     claw.solver = solver
 
-    claw.output_format = 'ascii'    
+    if use_petsc:
+        claw.output_format = 'ascii'
+    else:
+        # Binary frames are much faster to write and to read than ascii
+        frames.binary_output(claw)
     claw.outdir = "./_output"
     claw.setplot = setplot
+    if checkpoint_every:
+        checkpoint.checkpoint_output(claw, every=checkpoint_every)
+    if restart_from is not None:
+        checkpoint.restart(claw, restart_from)
 
     return claw
 
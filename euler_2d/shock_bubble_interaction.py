@@ -24,27 +24,40 @@ This problem demonstrates:
     - how to incorporate source (non-hyperbolic) terms using both Classic and SharpClaw solvers
     - how to impose a custom boundary condition
     - how to use the auxiliary array for spatially-varying coefficients
+    - how to time the parts of each step (run with profile=True)
+    - how to write only density and tracer along the axis r=0 instead of
+      full frames (run with reduced_output=True)
+    - how to save checkpoints (checkpoint_every=5) and continue a run from
+      one (restart_from='_output')
 """
 
+import weakref
 import numpy as np
 from clawpack import riemann
 from clawpack.riemann.euler_5wave_2D_constants import density, x_momentum, y_momentum, \
-        energy, num_eqn
+        energy, tracer, num_eqn
+from chpde import bc, checkpoint, geometry, history, instrument, reduced
 
 gamma = 1.4 # Ratio of specific heats
 
 x0=0.5; y0=0.0; r0=0.2
 
+# Source term workspaces, one per solver
+_radial_work = weakref.WeakKeyDictionary()
 
-def ycirc(x,ymin,ymax):
-    if ((x-x0)**2)<(r0**2):
-        return max(min(y0 + np.sqrt(r0**2-(x-x0)**2),ymax) - ymin,0.0)
-    else:
-        return 0
 
-def qinit(state,rhoin=0.1,pinf=5.0):
-    from scipy import integrate
+def post_shock_state(pinf=5.0):
+    """
+    Density, velocity and energy behind a shock with pressure pinf moving
+    into gas at rest with unit density and pressure.
+    """
+    gamma1 = gamma - 1.0
+    rinf = (gamma1 + pinf*(gamma+1.))/ ((gamma+1.) + gamma1*pinf)
+    vinf = 1.0/np.sqrt(gamma) * (pinf - 1.0) / np.sqrt(0.5*((gamma+1.0)/gamma) * pinf+0.5*gamma1/gamma)
+    einf = 0.5*rinf*vinf**2 + pinf/gamma1
+    return rinf, vinf, einf
 
+def qinit(state,rhoin=0.1,pinf=5.0):
     gamma1 = gamma - 1.0
 
     grid = state.grid
@@ -54,65 +67,72 @@ def qinit(state,rhoin=0.1,pinf=5.0):
     pin    = 1.0
     xshock = 0.2
 
-    rinf = (gamma1 + pinf*(gamma+1.))/ ((gamma+1.) + gamma1*pinf)
-    vinf = 1.0/np.sqrt(gamma) * (pinf - 1.0) / np.sqrt(0.5*((gamma+1.0)/gamma) * pinf+0.5*gamma1/gamma)
-    einf = 0.5*rinf*vinf**2 + pinf/gamma1
+    rinf, vinf, einf = post_shock_state(pinf)
     
     X, Y = grid.p_centers
 
-    r = np.sqrt((X-x0)**2 + (Y-y0)**2)
+    # Fraction of each cell inside the bubble
+    infrac = geometry.circle_fraction(grid,(x0,y0),r0)
 
-    #First set the values for the cells that don't intersect the bubble boundary
-    state.q[0,:,:] = rinf*(X<xshock) + rhoin*(r<=r0) + rhoout*(r>r0)*(X>=xshock)
+    state.q[0,:,:] = rinf*(X<xshock) + (rhoin*infrac + rhoout*(1.0-infrac))*(X>=xshock)
     state.q[1,:,:] = rinf*vinf*(X<xshock)
     state.q[2,:,:] = 0.0
-    state.q[3,:,:] = einf*(X<xshock) + (pin*(r<=r0) + pout*(r>r0)*(X>=xshock))/gamma1
-    state.q[4,:,:] = 1.0*(r<=r0)
-
-    #Now compute average density for the cells on the edge of the bubble
-    d2 = np.linalg.norm(state.grid.delta)/2.
-    dx = state.grid.delta[0]
-    dy = state.grid.delta[1]
-    dx2 = state.grid.delta[0]/2.0
-    dy2 = state.grid.delta[1]/2.0
-    for i in range(state.q.shape[1]):
-        for j in range(state.q.shape[2]):
-            ydown = Y[i,j]-dy2
-            yup   = Y[i,j]+dy2
-            if abs(r[i,j]-r0)<d2:
-                infrac,abserr = integrate.quad(ycirc,X[i,j]-dx2,X[i,j]+dx2,args=(ydown,yup),epsabs=1.0e-8,epsrel=1.0e-5)
-                infrac=infrac/(dx*dy)
-                state.q[0,i,j] = rhoin*infrac + rhoout*(1.0-infrac)
-                state.q[3,i,j] = (pin*infrac + pout*(1.0-infrac))/gamma1
-                state.q[4,i,j] = 1.0*infrac
+    state.q[3,:,:] = einf*(X<xshock) + (pin*infrac + pout*(1.0-infrac))*(X>=xshock)/gamma1
+    state.q[4,:,:] = infrac
 
 
 def auxinit(state):
     """
-    aux[1,i,j] = radial coordinate of cell centers for cylindrical source terms
+    aux[0,i,j] = radial coordinate of cell centers for cylindrical source terms
     """
-    y = state.grid.y.centers
-    for j,r in enumerate(y):
-        state.aux[0,:,j] = r
+    state.aux[0,:,:] = state.grid.y.centers
+
 
+# Incoming shock at left boundary
+rinf, vinf, einf = post_shock_state()
+incoming_shock = bc.dirichlet([rinf, rinf*vinf, 0.0, einf, 0.0])
 
-def incoming_shock(state,dim,t,qbc,auxbc,num_ghost):
+
+def _radial_source(q,src,tmp):
     """
-    Incoming shock at left boundary.
+    Store rho*v, rho*u*v, rho*v*v and v*(E+p), i.e. minus r times the
+    geometric source terms, in src without allocating memory.
+    tmp holds two scratch arrays of the shape of one component.
     """
-    gamma1 = gamma - 1.0
+    rho, mu, mv, E = q[0,:,:], q[1,:,:], q[2,:,:], q[3,:,:]
+    v, t = tmp
+
+    np.divide(mv,rho,out=v)
+    np.copyto(src[0],mv)
+    np.multiply(mu,v,out=src[1])
+    np.multiply(mv,v,out=src[2])
+
+    # E + p = gamma*E - 0.5*(gamma-1)*rho*(u**2+v**2)
+    np.multiply(mu,mu,out=t)
+    np.divide(t,rho,out=t)
+    np.add(t,src[2],out=t)
+    np.multiply(t,-0.5*(gamma-1.0),out=t)
+    np.multiply(E,gamma,out=src[3])
+    np.add(src[3],t,out=src[3])
+    np.multiply(src[3],v,out=src[3])
 
-    pinf = 5.0
-    rinf = (gamma1 + pinf*(gamma+1.0))/ ((gamma+1.0) + gamma1*pinf)
-    vinf = 1.0/np.sqrt(gamma) * (pinf - 1.0) / np.sqrt(0.5*((gamma+1.0)/gamma) * pinf+0.5*gamma1/gamma)
-    einf = 0.5*rinf*vinf**2 + pinf/gamma1
 
-    for i in range(num_ghost):
-        qbc[0,i,...] = rinf
-        qbc[1,i,...] = rinf*vinf
-        qbc[2,i,...] = 0.0
-        qbc[3,i,...] = einf
-        qbc[4,i,...] = 0.0
+def _radial_workspace(solver,state):
+    """
+    Scratch arrays for the source term routines and the reciprocal of the
+    radius, computed once per solver.  The radius aux[0] does
+    not change in time, so it is shared by all steps and SharpClaw stages.
+    """
+    work = _radial_work.get(solver)
+    if work is None or work['dq'].shape != state.q.shape:
+        shape = state.q.shape
+        work = {'rinv' : 1.0/state.aux[0,:,:],
+                'src'  : np.empty((4,)+shape[1:]),
+                'qstar': np.empty((4,)+shape[1:]),
+                'dq'   : np.zeros(shape),
+                'tmp'  : (np.empty(shape[1:]), np.empty(shape[1:]))}
+        _radial_work[solver] = work
+    return work
 
 
 def step_Euler_radial(solver,state,dt):
@@ -121,6 +141,32 @@ def step_Euler_radial(solver,state,dt):
     Integrated using a 2-stage, 2nd-order Runge-Kutta method.
     This is a Clawpack-style source term routine, which approximates
     the integral of the source terms over a step.
+
+    All intermediate values are kept in a workspace stored for the solver,
+    so no arrays are allocated per step.
+    """
+    q = state.q
+    work = _radial_workspace(solver,state)
+    src, qstar, rinv = work['src'], work['qstar'], work['rinv']
+
+    _radial_source(q,src,work['tmp'])
+    for m in range(4):
+        np.multiply(src[m],rinv,out=src[m])
+        np.multiply(src[m],dt/2.0,out=src[m])
+        np.subtract(q[m,:,:],src[m],out=qstar[m])
+
+    _radial_source(qstar,src,work['tmp'])
+    for m in range(4):
+        np.multiply(src[m],rinv,out=src[m])
+        np.multiply(src[m],dt,out=src[m])
+        np.subtract(q[m,:,:],src[m],out=q[m,:,:])
+
+
+def step_Euler_radial_unfused(solver,state,dt):
+    """
+    Geometric source terms for Euler equations with cylindrical symmetry.
+    Same as step_Euler_radial, but written with whole-array expressions
+    that allocate temporaries; kept for comparison.
     """
     dt2 = dt/2.0
 
@@ -155,27 +201,25 @@ def dq_Euler_radial(solver,state,dt):
     Geometric source terms for Euler equations with radial symmetry.
     This is a SharpClaw-style source term routine, which returns
     the value of the source terms.
-    """
-    q   = state.q
-    rad = state.aux[0,:,:]
 
-    rho = q[0,:,:]
-    u   = q[1,:,:]/rho
-    v   = q[2,:,:]/rho
-    press  = (gamma - 1.0) * (q[3,:,:] - 0.5*rho*(u**2 + v**2))
-
-    dq = np.empty(q.shape)
+    The returned array is a workspace that is overwritten by the next call.
+    """
+    work = _radial_workspace(solver,state)
+    dq = work['dq']
 
-    dq[0,:,:] = -dt/rad * q[2,:,:]
-    dq[1,:,:] = -dt/rad * rho*u*v
-    dq[2,:,:] = -dt/rad * rho*v*v
-    dq[3,:,:] = -dt/rad * v * (q[3,:,:] + press)
-    dq[4,:,:] = 0.0
+    _radial_source(state.q,dq,work['tmp'])
+    for m in range(4):
+        np.multiply(dq[m],work['rinv'],out=dq[m])
+        np.multiply(dq[m],-dt,out=dq[m])
 
     return dq
 
 def setup(use_petsc=False,solver_type='classic', outdir='_output', kernel_language='Fortran',
-        disable_output=False, mx=320, my=80, tfinal=0.6, num_output_times = 10):
+        disable_output=False, mx=320, my=80, tfinal=0.6, num_output_times = 10,
+        fused_source=True, profile=False, reduced_output=False, checkpoint_every=None,
+        restart_from=None, frame_history=False):
+    if reduced_output and use_petsc:
+        raise Exception('Reduced output along the axis is not implemented with PETSc.')
     if use_petsc:
         import clawpack.petclaw as pyclaw
     else:
@@ -188,7 +232,10 @@ def setup(use_petsc=False,solver_type='classic', outdir='_output', kernel_langua
         solver.lim_type   = 2
     else:
         solver = pyclaw.ClawSolver2D(riemann.euler_5wave_2D)
-        solver.step_source = step_Euler_radial
+        if fused_source:
+            solver.step_source = step_Euler_radial
+        else:
+            solver.step_source = step_Euler_radial_unfused
         solver.source_split = 1
         solver.limiters = [4,4,4,4,2]
         solver.cfl_max = 0.5
@@ -202,7 +249,8 @@ def setup(use_petsc=False,solver_type='classic', outdir='_output', kernel_langua
     state = pyclaw.State(domain,num_eqn,num_aux)
     state.problem_data['gamma']= gamma
 
-    qinit(state)
+    if restart_from is None:
+        qinit(state)
     auxinit(state)
 
     solver.user_bc_lower = incoming_shock
@@ -222,12 +270,29 @@ def setup(use_petsc=False,solver_type='classic', outdir='_output', kernel_langua
     claw.solver = solver
 
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
     if disable_output:
         claw.output_format = None
     claw.tfinal = tfinal
     claw.num_output_times = num_output_times
     claw.outdir = outdir
     claw.setplot = setplot
+    if reduced_output and not disable_output:
+        # Cells next to the axis, written to axis.XXXX.npz
+        reduced.reduced_output(claw, frames=False,
+                               axis=reduced.Cut(0, 0.0, components=[density, tracer]))
+
+    if checkpoint_every:
+        checkpoint.checkpoint_output(claw, every=checkpoint_every)
+    if restart_from is not None:
+        # q, t and the solver state from the checkpoint
+        checkpoint.restart(claw, restart_from)
+
+    if profile:
+        # Time spent in the Fortran kernels vs. the Python source term and
+        # boundary condition, reported at the end of claw.run()
+        instrument.attach(claw, trace='trace.json')
 
     return claw
 
@@ -27,27 +27,20 @@ to handle other internal boundary geometries, as long as they are
 aligned with the grid.
 """
 
+from chpde import bc, history
+
 gamma = 1.4 # Ratio of specific heats
 
-def incoming_shock(state,dim,t,qbc,auxbc,num_ghost):
-    """
-    Incoming shock at left boundary.
-    """
-    rho = 1.4
-    u   = 3.0
-    v   = 0.0
-    p   = 1.0
+def shock_state(rho=1.4, u=3.0, v=0.0, p=1.0):
+    return [rho, rho*u, rho*v, p/(gamma-1.0) + 0.5 * rho * (u**2 + v**2)]
 
-    for i in range(num_ghost):
-        qbc[0,i,...] = rho
-        qbc[1,i,...] = rho*u
-        qbc[2,i,...] = rho*v
-        qbc[3,i,...] = p/(gamma-1.0) + 0.5 * rho * (u**2 + v**2)
+# Incoming shock at left boundary
+incoming_shock = bc.dirichlet(shock_state())
 
 
 def setup(use_petsc=False,solver_type='classic', outdir='_output', 
           kernel_language='Fortran', disable_output=False, mx=320, my=80,
-          tfinal=2.5, num_output_times = 25):
+          tfinal=2.5, num_output_times = 25, frame_history=False):
 
     if use_petsc:
         import clawpack.petclaw as pyclaw
@@ -106,6 +99,8 @@ def setup(use_petsc=False,solver_type='classic', outdir='_output',
     claw.solver = solver
 
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
     if disable_output:
         claw.output_format = None
     claw.tfinal = tfinal
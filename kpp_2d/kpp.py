@@ -11,11 +11,16 @@ Solve the KPP equation:
 
 first proposed by Kurganov, Petrova, and Popov.  It is challenging for schemes
 with low numerical viscosity to capture the solution accurately.
+
+Run with checkpoint_every=n to save a checkpoint every n output frames, and
+with restart_from='_output' to continue from the latest one.
 """
 import numpy as np
 from clawpack import riemann
+from chpde import checkpoint, history
 
-def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
+def setup(use_petsc=False,outdir='./_output',solver_type='classic',
+          checkpoint_every=None,restart_from=None, frame_history=False):
 
     if use_petsc:
         import clawpack.petclaw as pyclaw
@@ -43,10 +48,11 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
     domain = pyclaw.Domain([x,y])
     state = pyclaw.State(domain,solver.num_eqn)
 
-    # Initial data
-    X, Y = state.grid.p_centers
-    r = np.sqrt(X**2 + Y**2)
-    state.q[0,:,:] = 0.25*np.pi + 3.25*np.pi*(r<=1.0)
+    # Initial data, unless it is taken from a checkpoint
+    if restart_from is None:
+        X, Y = state.grid.p_centers
+        r = np.sqrt(X**2 + Y**2)
+        state.q[0,:,:] = 0.25*np.pi + 3.25*np.pi*(r<=1.0)
 
     claw = pyclaw.Controller()
     claw.tfinal = 1.0
@@ -54,6 +60,12 @@ def setup(use_petsc=False,outdir='./_output',solver_type='classic'):
     claw.solver = solver
     claw.setplot = setplot
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
+    if checkpoint_every:
+        checkpoint.checkpoint_output(claw, every=checkpoint_every)
+    if restart_from is not None:
+        checkpoint.restart(claw, restart_from)
 
     return claw
 
@@ -14,24 +14,30 @@ Solve the 2D shallow water equations:
 The initial condition is a circular area with high depth surrounded by lower-depth water.
 The top and right boundary conditions reflect, while the bottom and left boundaries
 are outflow.
+
+With profiles=True only the average, min and max of q over circles around the
+center are written at each output time (radial.XXXX.npz), not the full frames.
 """
 
 import numpy as np
 from clawpack import riemann
 from clawpack.riemann.shallow_roe_with_efix_2D_constants import depth, x_momentum, y_momentum, num_eqn
+from chpde import geometry, history, reduced
 
 def qinit(state,h_in=2.0,h_out=1.0,dam_radius=0.5):
     x0, y0 = 0.0, 0.0
-    X, Y = state.p_centers
-    r = np.sqrt((X-x0)**2 + (Y-y0)**2)
+    infrac = geometry.circle_fraction(state.grid,(x0,y0),dam_radius)
 
-    state.q[depth     ,:,:] = h_in*(r<=dam_radius) + h_out*(r>dam_radius)
+    state.q[depth     ,:,:] = h_in*infrac + h_out*(1.0-infrac)
     state.q[x_momentum,:,:] = 0.0
     state.q[y_momentum,:,:] = 0.0
 
     
 def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
-          solver_type='classic', riemann_solver='roe',disable_output=False):
+          solver_type='classic', riemann_solver='roe',disable_output=False,
+          profiles=False, frame_history=False):
+    if profiles and use_petsc:
+        raise Exception('Radial profiles are not implemented with PETSc.')
     if use_petsc:
         import clawpack.petclaw as pyclaw
     else:
@@ -81,6 +87,11 @@ def setup(kernel_language='Fortran', use_petsc=False, outdir='./_output',
     claw.num_output_times = 10
     claw.setplot = setplot
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
+    if profiles and not disable_output:
+        reduced.reduced_output(claw, frames=False,
+                               radial=reduced.RadialAverage((0.0, 0.0), nbins=mx//2))
 
     return claw
 
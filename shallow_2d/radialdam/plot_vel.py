@@ -2,8 +2,8 @@ from mpl_toolkits import mplot3d
 from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
 import matplotlib.pyplot as plt
-import clawpack.pyclaw as pyclaw
 import argparse
+from chpde import frames
 
 from matplotlib import rcParams
 rcParams['font.size'] = 12
@@ -14,15 +14,6 @@ rcParams['lines.markersize'] = 6
 rcParams['axes.titlesize'] = 12
 rcParams['axes.labelsize'] = 12
 
-#------------------------------------------------------------------------------
-def read(frame, dir, petsc):
-    f = pyclaw.Solution()
-    if petsc:
-        f.read(frame, dir, read_aux=False, file_prefix='claw', 
-               file_format='petsc')
-    else:
-        f.read(frame, dir, read_aux=False)
-    return f
 #------------------------------------------------------------------------------
 # Data Reading
 
@@ -38,26 +29,20 @@ dir = args.d
 
 print('Dir   = ', dir)
 
-# Read first frame and make grid
-f = read(0, dir, args.petsc)
-x, y  = f.state.grid.p_centers
-nx, ny = f.state.grid.num_cells
+# Frames are read ahead while the current one is plotted
+reader = frames.FrameReader(dir, petsc=args.petsc)
+print('Frames = ', len(reader))
 
-# Contour levels to draw
-levels = np.arange(0.0, 2.0, 0.1)
+# Contour levels to draw, the same for all frames
+catalog = frames.Catalog(dir, petsc=args.petsc)
+levels = np.linspace(*catalog.limits(0), 21)
 
 fig = plt.figure(layout='tight')
 ax = fig.add_subplot(111)
 plt.show(block=False)
 
-for frame in range(1000):
-    try:
-        f = read(frame, dir, args.petsc)
-    except:
-        print("Reached end of frames")
-        input("Press Enter to exit")
-        break
-
+for frame, f in reader:
+    x, y = f.state.grid.p_centers
     t  = f.state.t
 
     # 2d plot data
@@ -68,7 +53,7 @@ for frame in range(1000):
     print('Frame, t = ', frame, t)
     t = "{:.3f}".format(t)
 
-    cont = ax.contourf(x,y,h,cmap='jet',levels=20)
+    cont = ax.contourf(x,y,h,cmap='jet',levels=levels)
     vel = ax.quiver(x, y, u, v, pivot='mid', color='white', scale=5)
     ax.set_xlim(0,2.5)
     ax.set_ylim(0,2.5)
@@ -78,4 +63,7 @@ for frame in range(1000):
     input("Press Enter to continue...")
     cont.remove(); vel.remove()
 
+print("Reached end of frames")
+input("Press Enter to exit")
+
 #------------------------------------------------------------------------------
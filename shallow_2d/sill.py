@@ -20,6 +20,7 @@ from clawpack import riemann
 from clawpack import pyclaw
 from clawpack.riemann.shallow_roe_with_efix_2D_constants import depth, x_momentum, y_momentum, num_eqn
 import numpy as np
+from chpde import bc, history
 
 amplitude = 0.1  # Height of incoming wave
 t_bdy = 5.0      # Stop sending in waves at this time
@@ -28,21 +29,18 @@ def bathymetry(x,y):
     r2 = (x-1.0)**2 + (y-0.5)**2
     return 0.8*np.exp(-10*r2)
 
-def wave_maker_bc(state,dim,t,qbc,auxbc,num_ghost):
+def wall_velocity(t):
     "Generate waves at left boundary as if there were a moving wall there."
-    if dim.on_lower_boundary:
-        qbc[0,:num_ghost,:]=qbc[0,num_ghost,:]
-        t=state.t
-        if t <= t_bdy:
-            vwall = amplitude*(np.sin(t*np.pi/1.5))
-        else:
-            vwall=0.0
-        for ibc in range(num_ghost-1):
-            qbc[1,num_ghost-ibc-1,:] = 2*vwall - qbc[1,num_ghost+ibc,:]
+    if t <= t_bdy:
+        return amplitude*(np.sin(t*np.pi/1.5))
+    else:
+        return 0.0
+
+wave_maker_bc = bc.wall(wall_velocity, normal=x_momentum)
 
 
 def setup(kernel_language='Fortran', solver_type='classic', use_petsc=False,
-          outdir='./_output'):
+          outdir='./_output', frame_history=False):
 
     solver = pyclaw.ClawSolver2D(riemann.shallow_bathymetry_fwave_2D)
     solver.dimensional_split = 1  # No transverse solver available
@@ -83,6 +81,8 @@ def setup(kernel_language='Fortran', solver_type='classic', use_petsc=False,
     claw.num_output_times = 60
     claw.setplot = setplot
     claw.keep_copy = True
+    if frame_history:
+        history.bound_frames(claw)
 
     return claw
 
@@ -10,11 +10,19 @@ Solve the Lighthill-Whitham-Richards (LWR) traffic flow model:
     q_t + u (q(1-q))_x & = 0.
 
 Here q is the density of cars, and u is a constant specifying the speed limit.
+
+On- and off-ramps are added with sources, a chpde.sources.Sources:
+
+    ramps = sources.Sources()
+    ramps.add(0.5, 0.05)
+    claw = setup(sources=ramps)
 """
 
 from clawpack import riemann
 
-def setup(use_petsc=0,outdir='./_output',solver_type='classic'):
+def setup(use_petsc=0,outdir='./_output',solver_type='classic',sources=None):
+    if sources is not None and use_petsc:
+        raise Exception('Sources are not implemented with PETSc.')
     if use_petsc:
         import clawpack.petclaw as pyclaw
     else:
@@ -25,6 +33,13 @@ def setup(use_petsc=0,outdir='./_output',solver_type='classic'):
     else:
         solver = pyclaw.ClawSolver1D(riemann.traffic_1D)
 
+    if sources is not None:
+        if solver_type=='sharpclaw':
+            solver.dq_src = sources.dq
+        else:
+            solver.step_source = sources
+            solver.source_split = 1
+
     solver.bc_lower[0] = pyclaw.BC.extrap
     solver.bc_upper[0] = pyclaw.BC.extrap
 